@@ -1,6 +1,19 @@
 import sys
 
 
+def to_flag (name):
+    """ Returns the command-line flag for an argument.
+
+    Single-character names become short flags (e.g. `-h`) while longer names become long flags (e.g. `--chunksize`).
+
+    Args:
+        name (str): The name of the argument.
+    Returns:
+        str: The flag for the argument.
+    """
+    return ('-' if len(name) == 1 else '--') + name
+
+
 def is_arg_passed (name):
     """ Returns true if an argument was passed, or false otherwise.
     Args:
@@ -8,7 +21,7 @@ def is_arg_passed (name):
     Returns:
         str: True if a the argument was passed, or false otherwise.
     """
-    arg = '-' + name
+    arg = to_flag(name)
     return arg in sys.argv
 
 
@@ -19,7 +32,7 @@ def get_valued_arg (name):
     Returns:
         str: The value of the argument, or none if it was not passed.
     """
-    arg = '-' + name
+    arg = to_flag(name)
     out = None
     if is_arg_passed(name):
         i = sys.argv.index(arg)
@@ -39,3 +52,22 @@ def get_int_valued_arg (name):
     if not value is None:
         value = int(value)
     return value
+
+
+def get_positional_args (valued_names=()):
+    """ Returns the arguments passed that are neither flags nor the values of valued arguments.
+    Args:
+        valued_names (list of str): The names of the valued arguments accepted.
+    Returns:
+        list of str: The positional arguments, in the order they were passed.
+    """
+    valued = [to_flag(name) for name in valued_names]
+    out = []
+    i = 1
+    while i < len(sys.argv):
+        if sys.argv[i] in valued:
+            i += 1 # Skip the value of this argument too.
+        elif not sys.argv[i].startswith('-'):
+            out.append(sys.argv[i])
+        i += 1
+    return out
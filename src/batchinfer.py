@@ -0,0 +1,151 @@
+import sys
+import os
+import glob
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from model.PasswordSetCharacteristics import PasswordSetCharacteristics
+
+from args import is_arg_passed, get_valued_arg, get_int_valued_arg, get_positional_args
+from inference import infer_policy
+
+
+def print_usage(show_help_line=False):
+    """ Prints the short help card for the program.
+    Args:
+        show_help_line (bool): If true, information on help flag `-h` will be printed.
+    """
+    print("Usage: python batchinfer.py [-hcblu] [-o <outfile>] [--jobs <n>] <features> [<features> ...]")
+    print("Infers policies from many features files produced by extractfeatures.py in parallel.")
+    if show_help_line:
+        print("For extended help use '-h' option.")
+
+
+def print_help():
+    """ Prints the full help card for the program.
+    """
+    print_usage()
+    print('Arguments:')
+    print('\tfeatures...: Features files, directories of them or glob patterns matching them (e.g. "features/*.json")')
+    print("Options:")
+    print("\t-h: Show this help screen")
+    print("\t-c: Cumulative frequency mode OFF (i.e. do not use cumulative frequencies)")
+    print("\t-b <limit>: The threshold to use for outlier detection")
+    print("\t-l <limit>: The lower limit of the features to use (default: 1)")
+    print("\t-u <limit>: The upper limit of the features to use (default: 20)")
+    print("\t-o <str>: The file to append output to, skipping features files it has output for that are unchanged since")
+    print("\t--jobs <int>: The number of worker processes to use (default: the number of CPUs)")
+    print()
+    print("Output will be in JSON Lines format, one line per features file as it is done, each with the file, its")
+    print("modification time, the options used and either the inferred policy (as from 'polinfer.py --all') or an")
+    print("error.")
+
+
+def find_features(patterns):
+    """ Finds the features files given by paths, directories or glob patterns.
+
+    Args:
+        patterns (list of str): The paths of features files or of directories of them, or glob patterns.
+    Returns:
+        list of str: The paths of the features files found, without duplicates, in the order given.
+    """
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            files += sorted(glob.glob(os.path.join(pattern, '*.json')) + glob.glob(os.path.join(pattern, '*.npz')))
+        elif os.path.isfile(pattern):
+            files.append(pattern)
+        else:
+            files += sorted(glob.glob(pattern))
+    return list(dict.fromkeys(files))
+
+
+def read_done(out, options):
+    """ Reads the modification times of features files already inferred from with the same options from output.
+
+    Files whose latest record holds an error are not counted as done, so that they are tried again.
+
+    Args:
+        out (str): The path of the JSON Lines output file.
+        options (dict): The options inference is done with.
+    Returns:
+        dict: The modification time of each features file done, keyed by absolute path.
+    """
+    done = {}
+    if os.path.isfile(out):
+        with open(out) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue # Skip any line cut short by an interrupted run.
+                if record.get('options') != options:
+                    continue
+                if 'error' in record:
+                    done.pop(record['file'], None)
+                else:
+                    done[record['file']] = record['mtime']
+    return done
+
+
+def infer_file(file, options):
+    """ Infers a policy from a features file, for use in a worker process.
+
+    Args:
+        file (str): The absolute path of the features file.
+        options (dict): The keyword arguments to pass to `infer_policy`.
+    Returns:
+        dict: The output record for the file.
+    """
+    record = {'file': file, 'mtime': os.path.getmtime(file), 'options': options}
+    try:
+        record['policy'] = infer_policy(PasswordSetCharacteristics.load(file), **options)
+    except Exception as e:
+        record['error'] = f'{type(e).__name__}: {e}'
+    return record
+
+
+# Only run when invoked directly, as worker processes import this module.
+if __name__ == '__main__':
+    # If no options specified, print usage and exit.
+    if len(sys.argv) == 1:
+        print_usage(True)
+        exit(0)
+
+    # If help flag specified, print help and exit.
+    if is_arg_passed('h'):
+        print_help()
+        exit(0)
+
+    # Read in inference options, applying defaults.
+    outlier_threshold = get_int_valued_arg('b')
+    low_lim = get_int_valued_arg('l')
+    high_lim = get_int_valued_arg('u')
+    options = {
+        'accum': not is_arg_passed('c'),
+        'low_lim': 1 if low_lim is None else low_lim,
+        'high_lim': 20 if high_lim is None else high_lim,
+        'outlier_threshold': 2 if outlier_threshold is None else outlier_threshold
+    }
+
+    # Get output path and number of worker processes if specified.
+    out = get_valued_arg('o')
+    jobs = get_int_valued_arg('jobs')
+    if jobs is None:
+        jobs = os.cpu_count()
+
+    # Find features files, skipping those unchanged since they were last inferred from.
+    files = [os.path.abspath(file) for file in find_features(get_positional_args(['b', 'l', 'u', 'o', 'jobs']))]
+    if out is not None:
+        done = read_done(out, options)
+        files = [file for file in files if done.get(file) != os.path.getmtime(file)]
+
+    # Infer from files in parallel, streaming out each record as it is done.
+    f = sys.stdout if out is None else open(out, 'a')
+    with ProcessPoolExecutor(jobs) as pool:
+        futures = [pool.submit(infer_file, file, options) for file in files]
+        for future in as_completed(futures): # In order of completion, so one slow file holds up no others.
+            f.write(json.dumps(future.result()) + '\n')
+            f.flush()
+    if out is not None:
+        f.close()
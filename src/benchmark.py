@@ -0,0 +1,179 @@
+import sys
+import os
+import json
+import time
+import platform
+import tempfile
+import subprocess
+
+from model.PasswordSetCharacteristics import PasswordSetCharacteristics
+
+from args import is_arg_passed, get_valued_arg, get_int_valued_arg
+from charclass import classify
+from combine import combine_dumps
+from dumpreader import read_pairs, read_chunks, write_pairs
+from extraction import extract_features
+from gendump import generate_dump
+from inference import infer_policy
+from introduceerrors import introduce_errors
+
+
+def print_usage(show_help_line=False):
+    """ Prints the short help card for the program.
+    Args:
+        show_help_line (bool): If true, information on help flag `-h` will be printed.
+    """
+    print("Usage: python benchmark.py [-h] [-o <outfile>] [--sizes <rows,...>] [--seed <int>] [--policy <name>]")
+    print("Benchmarks feature extraction, combining, error injection and inference on synthetic password dumps.")
+    if show_help_line:
+        print("For extended help use '-h' option.")
+
+
+def print_help():
+    """ Prints the full help card for the program.
+    """
+    print_usage()
+    print("Options:")
+    print("\t-h: Show this help screen")
+    print("\t-o <str>: The file in which to place output")
+    print("\t--sizes <str>: Comma-separated numbers of rows to benchmark at (default: 100000,1000000,10000000)")
+    print("\t--seed <int>: The seed for generating dumps (default: 0)")
+    print("\t--policy <str>: The policy generated dumps comply with, as accepted by gendump.py (default: none)")
+    print()
+    print("Each task runs in its own process. Output will be in JSON format, with the throughput and peak resident")
+    print("memory of each task at each size. Inference is run on features extracted beforehand, and its time is given")
+    print("per call rather than as a throughput.")
+
+
+def run_task(task, dump, extra, out):
+    """ Runs a single benchmark task in this process, returning the time taken by the work itself.
+
+    Args:
+        task (str): The name of the task.
+        dump (str): The path of the dump to use, or of the features extracted from it for inference.
+        extra (str): The path of a second, smaller dump to combine with the first.
+        out (str): The path of a file in which to place any output.
+    Returns:
+        float: The time taken, in seconds, or per call for inference.
+    """
+    if task == 'classify':
+        pwds = [pwd for pwd, freq in read_pairs(dump)]
+        start = time.perf_counter()
+        for pwd in pwds:
+            classify(pwd)
+    elif task == 'add':
+        rows = list(read_pairs(dump))
+        start = time.perf_counter()
+        characteristics = PasswordSetCharacteristics()
+        for pwd, freq in rows:
+            characteristics.add(pwd, freq)
+    elif task == 'extract':
+        start = time.perf_counter()
+        extract_features(dump).save(out)
+    elif task == 'combine':
+        start = time.perf_counter()
+        combine_dumps([dump, extra]).to_csv(out, index=False)
+    elif task == 'errors':
+        start = time.perf_counter()
+        with open(out, 'wb') as f:
+            write_pairs(f, introduce_errors(read_chunks(dump)))
+    elif task == 'infer':
+        characteristics = PasswordSetCharacteristics.load(dump)
+        start = time.perf_counter()
+        for i in range(0, INFER_CALLS):
+            infer_policy(characteristics)
+        return (time.perf_counter() - start) / INFER_CALLS
+    return time.perf_counter() - start
+
+
+def measure_task(task, rows, dump, extra, out):
+    """ Runs a benchmark task in a new process, measuring its throughput and peak memory use.
+
+    Args:
+        task (str): The name of the task.
+        rows (int): The number of rows in the dump.
+        dump (str): The path of the dump to use, or of the features extracted from it for inference.
+        extra (str): The path of a second, smaller dump to combine with the first.
+        out (str): The path of a file in which to place any output.
+    Returns:
+        dict: The results of the task.
+    """
+    child = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--task', task, dump, extra, out],
+        stdout=subprocess.PIPE)
+    output = child.stdout.read()
+    pid, status, usage = os.wait4(child.pid, 0) # Resource usage of this task alone.
+    child.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -1
+    if child.returncode != 0:
+        raise RuntimeError(f'Benchmark task {task} failed with exit code {child.returncode}.')
+    seconds = json.loads(output)['seconds']
+    result = {'task': task, 'rows': rows, 'seconds': seconds}
+    if task == 'infer':
+        result['secondsPerCall'] = seconds # Inference works on features, so takes no longer for more rows.
+    else:
+        result['rowsPerSecond'] = rows / seconds if seconds > 0 else None
+    result['peakRssBytes'] = usage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024) # Kilobytes, except on macOS.
+    return result
+
+
+# The tasks to benchmark, in the order they are run.
+TASKS = ['classify', 'add', 'extract', 'combine', 'errors', 'infer']
+
+# The number of times to infer a policy, as a single inference is too quick to time reliably.
+INFER_CALLS = 10
+
+
+# Only run when invoked directly.
+if __name__ == '__main__':
+    # Run a single task if asked to by the parent process, then exit.
+    if is_arg_passed('task'):
+        print(json.dumps({'seconds': run_task(get_valued_arg('task'), *sys.argv[-3:])}))
+        exit(0)
+
+    # If help flag specified, print help and exit.
+    if is_arg_passed('h'):
+        print_help()
+        exit(0)
+
+    # Read in options, applying defaults.
+    out = get_valued_arg('o')
+    sizes = get_valued_arg('sizes')
+    sizes = [100000, 1000000, 10000000] if sizes is None else [int(size) for size in sizes.split(',')]
+    seed = get_int_valued_arg('seed')
+    if seed is None:
+        seed = 0
+    policy = get_valued_arg('policy')
+    if policy is None:
+        policy = 'none'
+
+    # Benchmark every task at every size.
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for size in sizes:
+            dump = os.path.join(temp_dir, 'dump.csv')
+            extra = os.path.join(temp_dir, 'extra.csv')
+            with open(dump, 'w') as f:
+                generate_dump(f, size, seed, policy=policy)
+            with open(extra, 'w') as f:
+                generate_dump(f, max(1, size // 10), seed + 1) # Padding, as when combining a dump with smaller ones.
+            features = os.path.join(temp_dir, 'features.json')
+            extract_features(dump).save(features) # So that inference is measured apart from extraction.
+            for task in TASKS:
+                source = features if task == 'infer' else dump
+                results.append(measure_task(task, size, source, extra, os.path.join(temp_dir, 'out')))
+                unit = 's per call' if task == 'infer' else 's'
+                print(f'{task} on {size} rows: {results[-1]["seconds"]:.3g}{unit}', file=sys.stderr)
+
+    # Print or save report.
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'seed': seed,
+        'policy': policy,
+        'results': results
+    }
+    if out is None:
+        print(json.dumps(report, indent=2))
+    else:
+        with open(out, 'w') as f:
+            json.dump(report, f, indent=2)
@@ -1,4 +1,22 @@
-import re
+from functools import lru_cache
+
+import numpy as np
+
+
+# Lookup tables mapping each byte to whether it is an ASCII lowercase letter, uppercase letter or digit. Bytes outside
+# ASCII are never set, as strings containing them are classified with their Unicode semantics instead.
+_BYTE_LOWER = np.zeros(256, dtype=np.bool_)
+_BYTE_LOWER[ord('a'):ord('z') + 1] = True
+_BYTE_UPPER = np.zeros(256, dtype=np.bool_)
+_BYTE_UPPER[ord('A'):ord('Z') + 1] = True
+_BYTE_DIGIT = np.zeros(256, dtype=np.bool_)
+_BYTE_DIGIT[ord('0'):ord('9') + 1] = True
+
+# Translation tables mapping each ASCII byte to a code for its class, and letters to a word byte and all else to a
+# space.
+_CLASS_TABLE = b''.join(b'l' if lower else b'u' if upper else b'd' if digit else b's'
+    for lower, upper, digit in zip(_BYTE_LOWER, _BYTE_UPPER, _BYTE_DIGIT))
+_WORD_TABLE = b''.join(b'w' if lower or upper else b' ' for lower, upper in zip(_BYTE_LOWER, _BYTE_UPPER))
 
 
 def is_symbol (c):
@@ -122,3 +140,138 @@ def count_classes (val):
     if count_symbols(val) > 0:
         total += 1
     return total
+
+
+def classify (val):
+    """ Computes every feature of a string in a single pass over its characters.
+
+    The result is identical to calling `len`, `count_lowers`, `count_uppers`, `count_digits`, `count_symbols`,
+    `count_classes` and `count_words` separately, but the string is only scanned once.
+
+    Args:
+        val (str): The string to classify.
+    Returns:
+        tuple of int: The length, lowercase letter, uppercase letter, digit, symbol, character class and word counts.
+    """
+    lowers = 0
+    uppers = 0
+    digits = 0
+    words = 0
+    in_word = False
+    for c in val:
+        if c.isalpha():
+            if not in_word:
+                in_word = True
+                words += 1
+        else:
+            in_word = False
+        if c.islower():
+            lowers += 1
+        elif c.isupper():
+            uppers += 1
+        elif c.isdigit():
+            digits += 1
+    length = len(val)
+    symbols = length - lowers - uppers - digits # Lowers, uppers and digits are mutually exclusive.
+    classes = (lowers > 0) + (uppers > 0) + (digits > 0) + (symbols > 0)
+    return length, lowers, uppers, digits, symbols, classes, words
+
+
+# Classifies strings as `classify` does, remembering the features of those seen recently as the same string often
+# recurs (e.g. once split by errors or padded with other dumps).
+classify_cached = lru_cache(maxsize=65536)(classify)
+
+
+def classify_bytes (val):
+    """ Computes every feature of a UTF-8 encoded string without decoding it, if it is ASCII.
+
+    ASCII strings are classified by translating each byte to a code for its class and counting codes, while any other
+    strings are decoded and passed to `classify` so that results always match its Unicode semantics.
+
+    Args:
+        val (bytes): The UTF-8 encoded string to classify.
+    Returns:
+        tuple of int: The length, lowercase letter, uppercase letter, digit, symbol, character class and word counts.
+    """
+    if not val.isascii():
+        return classify(val.decode('utf-8', 'surrogateescape'))
+    codes = val.translate(_CLASS_TABLE)
+    lowers = codes.count(b'l')
+    uppers = codes.count(b'u')
+    digits = codes.count(b'd')
+    length = len(val)
+    symbols = length - lowers - uppers - digits
+    classes = (lowers > 0) + (uppers > 0) + (digits > 0) + (symbols > 0)
+    return length, lowers, uppers, digits, symbols, classes, len(val.translate(_WORD_TABLE).split())
+
+
+def _segment_sums (flags, starts, ends):
+    """ Sums a flag array over consecutive segments.
+
+    Args:
+        flags (ndarray): The boolean flag array.
+        starts (ndarray): The start offset of each segment.
+        ends (ndarray): The end offset (exclusive) of each segment.
+    Returns:
+        ndarray: The number of set flags in each segment.
+    """
+    totals = np.zeros(len(flags) + 1, dtype=np.int32 if len(flags) < 1 << 31 else np.int64) # Narrower sums are faster.
+    np.cumsum(flags, out=totals[1:])
+    return totals[ends] - totals[starts]
+
+
+def classify_many (vals):
+    """ Computes every feature of each string in a sequence using vectorized operations.
+
+    ASCII strings are classified together over a single byte buffer using lookup tables, while any non-ASCII strings
+    fall back to `classify_cached` so that results always match the Unicode semantics of `classify`. Strings may be
+    given as UTF-8 encoded bytes, as read from a dump in binary mode, in which case ASCII strings are never decoded.
+
+    Args:
+        vals (list of str or list of bytes): The strings to classify.
+    Returns:
+        tuple of ndarray: The length, lowercase letter, uppercase letter, digit, symbol, character class and word counts
+        of each string.
+    """
+    features = np.zeros((7, len(vals)), dtype=np.int64)
+    binary = len(vals) > 0 and isinstance(vals[0], bytes)
+
+    # Lay out all strings end-to-end, only splitting out those we can't classify by byte if there are any.
+    joined = b''.join(vals) if binary else ''.join(vals)
+    if joined.isascii():
+        is_ascii = np.ones(len(vals), dtype=np.bool_)
+        ascii_vals = vals
+    else:
+        is_ascii = np.fromiter((val.isascii() for val in vals), dtype=np.bool_, count=len(vals))
+        ascii_vals = [val for val, a in zip(vals, is_ascii) if a]
+        joined = b''.join(ascii_vals) if binary else ''.join(ascii_vals)
+
+    if len(ascii_vals) > 0:
+        buffer = np.frombuffer(joined if binary else joined.encode('ascii'), dtype=np.uint8)
+        lengths = np.fromiter(map(len, ascii_vals), dtype=np.int64, count=len(ascii_vals))
+        ends = np.cumsum(lengths)
+        starts = ends - lengths
+
+        # Count characters in each class using lookup tables.
+        is_lower = _BYTE_LOWER[buffer]
+        is_upper = _BYTE_UPPER[buffer]
+        lowers = _segment_sums(is_lower, starts, ends)
+        uppers = _segment_sums(is_upper, starts, ends)
+        digits = _segment_sums(_BYTE_DIGIT[buffer], starts, ends)
+        symbols = lengths - lowers - uppers - digits
+
+        # A word starts at any letter not preceded by a letter in the same string.
+        letters = is_lower | is_upper
+        word_starts = letters.copy()
+        word_starts[1:] &= ~letters[:-1]
+        word_starts[starts[lengths > 0]] = letters[starts[lengths > 0]]
+        words = _segment_sums(word_starts, starts, ends)
+
+        classes = (lowers > 0).astype(np.int64) + (uppers > 0) + (digits > 0) + (symbols > 0)
+        features[:, is_ascii] = (lengths, lowers, uppers, digits, symbols, classes, words)
+
+    # Classify remaining strings one at a time.
+    for i in np.flatnonzero(~is_ascii):
+        features[:, i] = classify_cached(vals[i].decode('utf-8', 'surrogateescape') if binary else vals[i])
+
+    return tuple(features)
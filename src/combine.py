@@ -1,10 +1,13 @@
 import sys
 import os
-import json
+import csv
+import math
+import tempfile
 
 import pandas as pd
 
-from args import is_arg_passed, get_valued_arg
+from args import is_arg_passed, get_valued_arg, get_int_valued_arg, get_positional_args
+from dumpreader import read_dump
 
 
 def print_usage(show_help_line=False):
@@ -12,8 +15,8 @@ def print_usage(show_help_line=False):
     Args:
         show_help_line (bool): If true, information on help flag `-h` will be printed.
     """
-    print("Usage: python combine.py [-h] [-o <outfile>] <infile1> <infile2>")
-    print("Combines two password data dumps together.")
+    print("Usage: python combine.py [-h] [-o <outfile>] [--chunksize <rows>] [--memory <mb>] <infile1> <infile2> [<infile3> ...]")
+    print("Combines two or more password data dumps together.")
     if show_help_line:
         print("For extended help use '-h' option.")
 
@@ -24,10 +27,13 @@ def print_help():
     print_usage()
     print('Arguments:')
     print('\tinfile1: The base password data dump')
-    print('\tinfile2: The password data dump to merge in')
+    print('\tinfile2...: The password data dumps to merge in')
     print("Options:")
     print("\t-h: Show this help screen")
     print('\t-o <str>: The file in which to place output')
+    print("\t--chunksize <int>: Read input files in chunks of this many rows")
+    print("\t--memory <int>: Spill to temporary files on disk to keep memory use under about this many megabytes")
+    print("\t                (plus a fixed 65-70 megabytes, mostly for loading pandas and NumPy, outside the budget)")
     print()
     print("Input files should be in CSV frequency distribution format:")
     print("\tpassword, frequency, ... <- Column headers")
@@ -35,57 +41,109 @@ def print_help():
     print("\t\"password\", 18, ...")
     print("\t\"matrix\", 14, ...")
     print("Output will be in CSV format.")
+    print("When spilling to disk, passwords are not output in the order they first appear.")
 
 
-# If no options specified, print usage and exit.
-if len(sys.argv) == 1:
-    print_usage(True)
-    exit(0)
+def combine_dumps (files, chunksize=None):
+    """ Combines password data dumps together, summing the frequencies of passwords appearing in more than one.
 
-# If help flag specified, print help and exit.
-if is_arg_passed('h'):
-    print_help()
-    exit(0)
+    Passwords are output in the order they first appear, taking files in the order given.
 
-# Get output path if one was specified.
-out = get_valued_arg('o')
+    Args:
+        files (list of str): The paths of the CSV files to combine.
+        chunksize (int): The number of rows to read per chunk, or none to read each file at once.
+    Returns:
+        DataFrame: The combined password frequency distribution.
+    """
+    frames = [frame[['password', 'frequency']] for file in files for frame in read_dump(file, chunksize)]
+    combined = pd.concat(frames, ignore_index=True)
+    return combined.groupby('password', sort=False, as_index=False)['frequency'].sum()
 
-# Last parameter is the raw filename.
-raw_file_1 = sys.argv[-1]
-raw_file_2 = sys.argv[-2]
-if not os.path.isfile(raw_file_1) or not os.path.isfile(raw_file_2):
-    emit_err('Input file not found.')
-    sys.exit(1)
 
-# Load CSV file.
-csv_1 = pd.read_csv(raw_file_1, error_bad_lines=False, skipinitialspace=True)
+# Approximate ratio of memory used to combine a dump to its size on disk, measured as peak resident memory (with
+# headroom for memory Python keeps hold of between shards).
+MEMORY_PER_BYTE = 20
 
-# Buffer one set of passwords.
-buffer = {}
-for ind, row in csv_1.iterrows():
-    buffer[str(row['password'])] = int(row['frequency'])
+# Approximate memory used by each row of a dump while it is read and partitioned, measured as for `MEMORY_PER_BYTE`.
+# Both come on top of a fixed overhead of about 65-70 megabytes (most of it from importing pandas and NumPy alone),
+# which is left out of the budget.
+MEMORY_PER_ROW = 1200
 
-def merge_buffer (row):
-    """ Merges a password frequency distribution dataframe with the contents of the buffer.
+
+def combine_dumps_external (files, out, memory, chunksize=None):
+    """ Combines password data dumps together using temporary files on disk to bound memory use.
+
+    Passwords are hash-partitioned across enough shard files that each shard can be combined in memory within the
+    budget given, then each shard is combined in turn and written out.
 
     Args:
-        row (Series): The series representing the row to merge.
-    Returns:
-        Series: The modified series.
+        files (list of str): The paths of the CSV files to combine.
+        out (str or file): The path of, or file in which to place output.
+        memory (int): The memory budget, in bytes.
+        chunksize (int): The number of rows to read per chunk, or none to derive it from the memory budget.
     """
-    pwd = str(row['password'])
-    if pwd in buffer:
-        row['frequency'] = int(row['frequency']) + buffer[pwd] # Add to frequency if appropriate.
-        buffer.pop(pwd, None) # Remove password from buffer.
-    return row
-
-# Load CSV file.
-csv_2 = pd.read_csv(raw_file_2, error_bad_lines=False, skipinitialspace=True)
-csv_2 = csv_2.apply(merge_buffer, axis=1)
-
-# Append passwords still left in buffer.
-for pwd, freq in buffer.items():
-    csv_2 = csv_2.append({'password': str(pwd), 'frequency': int(freq)}, ignore_index=True)
-
-# Print data frame.
-csv_2.to_csv(out if not out is None else sys.stdout, index=False)
+    if chunksize is None:
+        chunksize = max(1, memory // MEMORY_PER_ROW)
+    total_size = sum(os.path.getsize(file) for file in files)
+    shards = max(1, math.ceil(total_size * MEMORY_PER_BYTE / memory))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Partition passwords from all inputs across shard files by hash.
+        shard_files = [os.path.join(temp_dir, f'{i}.csv') for i in range(0, shards)]
+        for shard_file in shard_files:
+            with open(shard_file, 'w') as f:
+                f.write('password,frequency\n')
+        for file in files:
+            for frame in read_dump(file, chunksize):
+                frame = frame[['password', 'frequency']]
+                # Hash encoded passwords, as any invalid bytes escaped when they were read can't be hashed as text.
+                encoded = pd.Series([pwd.encode('utf-8', 'surrogateescape') for pwd in frame['password'].tolist()])
+                keys = pd.util.hash_pandas_object(encoded, index=False) % shards
+                for shard, group in frame.groupby(keys.to_numpy()):
+                    group.to_csv(shard_files[shard], mode='a', header=False, index=False,
+                        quoting=csv.QUOTE_NONNUMERIC, encoding='utf-8', errors='surrogateescape')
+
+        # Combine each shard in memory, then stream it out.
+        header = True
+        for shard_file in shard_files:
+            combined = combine_dumps([shard_file])
+            combined.to_csv(out, mode='a' if not header else 'w', header=header, index=False,
+                quoting=csv.QUOTE_NONNUMERIC, encoding='utf-8', errors='surrogateescape')
+            header = False
+            os.remove(shard_file) # Free disk space as we go.
+
+
+# Only run when invoked directly, as other programs may import this module.
+if __name__ == '__main__':
+    # If no options specified, print usage and exit.
+    if len(sys.argv) == 1:
+        print_usage(True)
+        exit(0)
+
+    # If help flag specified, print help and exit.
+    if is_arg_passed('h'):
+        print_help()
+        exit(0)
+
+    # Get output path, chunk size and memory budget if specified.
+    out = get_valued_arg('o')
+    chunksize = get_int_valued_arg('chunksize')
+    memory = get_int_valued_arg('memory')
+
+    # Remaining parameters are the raw filenames.
+    raw_files = get_positional_args(['o', 'chunksize', 'memory'])
+    if len(raw_files) < 2:
+        print('At least two input files are required.', file=sys.stderr)
+        sys.exit(1)
+    if not all(os.path.isfile(raw_file) for raw_file in raw_files):
+        print('Input file not found.', file=sys.stderr)
+        sys.exit(1)
+
+    # Merge all files and print data frame, spilling to disk if a memory budget was given. Any invalid bytes escaped
+    # when passwords were read are written back unchanged, so output goes to the binary buffer of standard output.
+    if memory is not None:
+        combine_dumps_external(raw_files, out if not out is None else sys.stdout.buffer, memory * 1024 * 1024,
+            chunksize)
+    else:
+        combined = combine_dumps(raw_files, chunksize)
+        combined.to_csv(out if not out is None else sys.stdout.buffer, index=False, quoting=csv.QUOTE_NONNUMERIC,
+            encoding='utf-8', errors='surrogateescape')
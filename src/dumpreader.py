@@ -0,0 +1,250 @@
+import os
+import re
+import csv
+import mmap
+import logging
+from functools import lru_cache
+
+import numpy as np
+
+
+# The logger malformed lines are reported to.
+logger = logging.getLogger(__name__)
+
+# The number of bytes parsed at once, rounded down to a line boundary.
+BLOCK_SIZE = 1 << 20
+
+# The number of malformed lines reported individually per file (or range), beyond which they are only counted.
+MAX_REPORTED = 10
+
+
+@lru_cache(maxsize=None)
+def _line_pattern (binary, extra):
+    """ Compiles the pattern matching one line of a password dump.
+
+    A line holds a password, quoted (with quotes escaped by doubling them) or not, then an integer frequency. Blank
+    lines match with no groups set, and anything else matches as a malformed line.
+
+    Args:
+        binary (bool): Whether to match bytes rather than strings.
+        extra (bool): Whether lines may have further columns after the frequency.
+    Returns:
+        Pattern: The compiled pattern, with groups for the quoted password, unquoted password, frequency and malformed
+            line.
+    """
+    pattern = (r'[ \t]*(?:"([^"\n]*(?:""[^"\n]*)*)"|([^",\n]*))[ \t]*,[ \t]*(\d+)[ \t]*'
+        + (r'(?:,[^\n]*)?' if extra else '') + r'\r?\n|[ \t]*\r?\n|([^\n]*)\n')
+    return re.compile(pattern.encode() if binary else pattern)
+
+
+def read_header (file):
+    """ Reads the column names from the header of a password dump formatted as a CSV file.
+
+    Args:
+        file (str): The path of the CSV file to read.
+    Returns:
+        list of str: The column names.
+    """
+    with open(file, 'rb') as f:
+        line = f.readline().decode('utf-8', 'surrogateescape')
+    return next(csv.reader([line], skipinitialspace=True), [])
+
+
+def header_size (file):
+    """ Gets the offset of the first byte after the header of a password dump formatted as a CSV file.
+
+    Args:
+        file (str): The path of the CSV file.
+    Returns:
+        int: The offset of the first line after the header.
+    """
+    with open(file, 'rb') as f:
+        f.readline()
+        return f.tell()
+
+
+def complete_size (file):
+    """ Gets the offset one past the last complete (i.e. newline-terminated) line of a file.
+
+    Lines still being appended to a file are never complete, so this is a safe point to stop reading a growing file.
+
+    Args:
+        file (str): The path of the file.
+    Returns:
+        int: The offset one past the last complete line.
+    """
+    size = os.path.getsize(file)
+    with open(file, 'rb') as f:
+        while size > 0:
+            f.seek(max(0, size - 65536))
+            block = f.read(size - f.tell())
+            if b'\n' in block:
+                return size - len(block) + block.rindex(b'\n') + 1
+            size -= len(block)
+    return 0
+
+
+def split_dump (file, parts, start=None, end=None):
+    """ Splits a password dump formatted as a CSV file into byte ranges of roughly equal size.
+
+    Ranges exclude the header and always begin and end on line boundaries, so each can be parsed independently.
+
+    Args:
+        file (str): The path of the CSV file to split.
+        parts (int): The number of ranges to split the file into.
+        start (int): The offset at which to start, which must begin a line, or none to start after the header.
+        end (int): The offset at which to stop, which must end a line, or none to stop at the end of the file.
+    Returns:
+        list of tuple: The start and end offset of each range.
+    """
+    size = os.path.getsize(file) if end is None else end
+    with open(file, 'rb') as f:
+        bounds = [header_size(file) if start is None else start]
+        for i in range(1, parts):
+            f.seek(max(bounds[0] + (size - bounds[0]) * i // parts - 1, bounds[-1]))
+            f.readline() # Advance to the start of the next line.
+            if bounds[-1] < f.tell() < size: # Skip ranges that would be empty.
+                bounds.append(f.tell())
+        bounds.append(size)
+    return [(bounds[i], bounds[i + 1]) for i in range(0, len(bounds) - 1) if bounds[i] < bounds[i + 1]]
+
+
+def _read_blocks (file, start=None, end=None, binary=False):
+    """ Reads a password dump formatted as a CSV file as a stream of blocks of rows, reporting malformed lines.
+
+    Args:
+        file (str): The path of the CSV file to read.
+        start (int): The offset of the first byte to read, which must begin a line, or none to start after the header.
+        end (int): The offset one past the last byte to read, which must end a line, or none to read to the end.
+        binary (bool): Whether to read passwords as bytes rather than strings.
+    Returns:
+        generator of tuple: The passwords and frequencies in each block, and the number of bytes it spans.
+    """
+    start = header_size(file) if start is None else start
+    end = os.path.getsize(file) if end is None else end
+    if start >= end:
+        return # Nothing to read in an empty range (which can't be mapped if the file is empty).
+    pattern = _line_pattern(binary, len(read_header(file)) > 2)
+    quote, escaped = (b'"', b'""') if binary else ('"', '""')
+    malformed = 0
+    with open(file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        position = start
+        while position < end:
+            cut = buffer.rfind(b'\n', position, min(position + BLOCK_SIZE, end)) + 1
+            if cut <= position: # A line longer than a block, or the last line without a newline.
+                cut = buffer.find(b'\n', position, end) + 1 or end
+            block = buffer[position:cut]
+            if not block.endswith(b'\n'):
+                block += b'\n'
+            if not binary:
+                block = block.decode('utf-8', 'surrogateescape') # Invalid bytes survive being encoded back.
+            pwds = []
+            freqs = []
+            for quoted, plain, freq, bad in pattern.findall(block):
+                if freq:
+                    pwds.append(quoted.replace(escaped, quote) if quoted else plain)
+                    freqs.append(int(freq))
+                elif bad:
+                    malformed += 1
+                    if malformed <= MAX_REPORTED:
+                        logger.warning('Skipping malformed line in %s: %r', file, bad)
+            yield pwds, freqs, cut - position
+            if hasattr(mmap, 'MADV_DONTNEED'):
+                # Release pages already read, so resident memory doesn't grow with the size of the file.
+                page = position - position % mmap.PAGESIZE
+                buffer.madvise(mmap.MADV_DONTNEED, page, cut - page)
+            position = cut
+    if malformed > MAX_REPORTED:
+        logger.warning('Skipped %d malformed lines in %s.', malformed, file)
+
+
+def read_pairs (file, start=None, end=None, binary=False):
+    """ Reads a password dump formatted as a CSV file as a stream of password and frequency pairs.
+
+    Passwords may be quoted, with any quotes within escaped by doubling them, and are decoded as UTF-8 with invalid
+    bytes escaped as lone surrogates. Malformed lines are skipped, and logged as warnings.
+
+    Args:
+        file (str): The path of the CSV file to read.
+        start (int): The offset of the first byte to read, as given by `split_dump`, or none to read the whole file.
+        end (int): The offset one past the last byte to read, as given by `split_dump`.
+        binary (bool): Whether to read passwords as bytes rather than strings.
+    Returns:
+        generator of tuple: The password and frequency on each line.
+    """
+    for pwds, freqs, size in _read_blocks(file, start, end, binary):
+        yield from zip(pwds, freqs)
+
+
+def read_chunks (file, chunksize=None, start=None, end=None, progress=None, binary=False):
+    """ Reads a password dump formatted as a CSV file as a stream of chunks of passwords and their frequencies.
+
+    Args:
+        file (str): The path of the CSV file to read.
+        chunksize (int): The number of rows to read per chunk, or none to read the whole file as one chunk.
+        start (int): The offset of the first byte to read, as given by `split_dump`, or none to read the whole file.
+        end (int): The offset one past the last byte to read, as given by `split_dump`.
+        progress (callable): Called with the number of rows and bytes read before each chunk is yielded, or none.
+        binary (bool): Whether to read passwords as bytes rather than strings.
+    Returns:
+        generator of tuple: The list of passwords and list of frequencies in each chunk.
+    """
+    if start is not None and start >= end:
+        return # Nothing to read in an empty range.
+    pwds = []
+    freqs = []
+    size = 0
+    empty = True
+    for block_pwds, block_freqs, block_size in _read_blocks(file, start, end, binary):
+        pwds += block_pwds
+        freqs += block_freqs
+        size += block_size
+        while chunksize is not None and len(pwds) >= chunksize:
+            if progress is not None:
+                progress(chunksize, size)
+            size = 0
+            empty = False
+            yield pwds[:chunksize], freqs[:chunksize]
+            del pwds[:chunksize]
+            del freqs[:chunksize]
+    if len(pwds) > 0 or empty: # The whole file is always at least one chunk, even if empty.
+        if progress is not None:
+            progress(len(pwds), size)
+        yield pwds, freqs
+
+
+def read_dump (file, chunksize=None, start=None, end=None, progress=None):
+    """ Reads a password dump formatted as a CSV file as dataframes, optionally as a stream of chunks.
+
+    Args:
+        file (str): The path of the CSV file to read.
+        chunksize (int): The number of rows to read per chunk, or none to read the whole file as one chunk.
+        start (int): The offset of the first byte to read, as given by `split_dump`, or none to read the whole file.
+        end (int): The offset one past the last byte to read, as given by `split_dump`.
+        progress (callable): Called with the number of rows and bytes read before each chunk is yielded, or none.
+    Returns:
+        generator of DataFrame: The chunks of the file, each with `password` and `frequency` columns.
+    """
+    import pandas as pd # Slow to import, and only needed by programs working with dataframes.
+    for pwds, freqs in read_chunks(file, chunksize, start, end, progress):
+        yield pd.DataFrame({'password': pd.Series(pwds, dtype=object), 'frequency': np.array(freqs, dtype=np.int64)})
+
+
+def write_pairs (out, pairs, header=True):
+    """ Writes passwords and their frequencies as a password dump formatted as a CSV file, in large buffered writes.
+
+    Passwords are always quoted, with any quotes within escaped by doubling them, and any invalid bytes escaped when
+    they were read are written back unchanged.
+
+    Args:
+        out (file): The binary file in which to place output.
+        pairs (iterable of tuple): The password and frequency of each row.
+        header (bool): Whether to write a header row first.
+    """
+    buffer = ['password, frequency\n'] if header else []
+    for pwd, freq in pairs:
+        buffer.append('"' + pwd.replace('"', '""') + '", ' + str(freq) + '\n')
+        if len(buffer) >= 10000:
+            out.write(''.join(buffer).encode('utf-8', 'surrogateescape'))
+            buffer = []
+    out.write(''.join(buffer).encode('utf-8', 'surrogateescape'))
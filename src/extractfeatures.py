@@ -1,12 +1,12 @@
 import sys
 import os
 import json
+import contextlib
 
-import pandas as pd
-
-from model.PasswordSetCharacteristics import PasswordSetCharacteristics
-
-from args import is_arg_passed
+from args import is_arg_passed, get_valued_arg, get_int_valued_arg
+from extraction import extract_features, update_features, sample_features
+from featurecache import FeatureCache
+from instrument import Instrument, profiled
 
 
 def print_usage(show_help_line=False):
@@ -14,7 +14,11 @@ def print_usage(show_help_line=False):
     Args:
         show_help_line (bool): If true, information on help flag `-h` will be printed.
     """
-    print("Usage: python extractfeatures.py [-h] <dumpfile>")
+    print("Usage: python extractfeatures.py [-h] [-o <outfile>] [--chunksize <rows>] [--jobs <n>] [--joint] [--dedupe]")
+    print("                                 [--update <features>] [--checkpoint] [--cache <dir>] [--cache-size <mb>]")
+    print("                                 [--progress] [--stats <file>] [--profile <file>] [--sample <rows>]")
+    print("                                 [--seed <int>]")
+    print("                                 <dumpfile>")
     print("Extracts features from a password dump formatted as a CSV file.")
     if show_help_line:
         print("For extended help use '-h' option.")
@@ -26,40 +30,142 @@ def print_help():
     print_usage()
     print("Options:")
     print("\t-h: Show this help screen")
+    print("\t-o <str>: The file in which to place output (binary format if it ends in '.npz')")
+    print("\t--chunksize <int>: Stream the file in chunks of this many rows to bound memory use")
+    print("\t--jobs <int>: Split the file across this many worker processes")
+    print("\t--joint: Also record joint histograms of length against class, digit and word counts")
+    print("\t--dedupe: Classify each distinct password once, which is faster if passwords recur (e.g. after errors)")
+    print("\t--update <str>: Fold the passwords into this features file, if it exists, and save it (or to -o if given)")
+    print("\t--checkpoint: Only read lines after the offset recorded in the --update features, then record the new one")
+    print("\t--cache <str>: Reuse features of identical files from this cache directory (default: $POLINFER_CACHE)")
+    print("\t--cache-size <int>: The size in megabytes above which old cache entries are evicted (default: 1024)")
+    print("\t--progress: Report rows read per second and the estimated time remaining to standard error")
+    print("\t--stats <str>: Save a JSON summary of time spent parsing, classifying and serializing, and peak memory use")
+    print("\t--profile <str>: Dump cProfile statistics to this file (worker processes aren't profiled)")
+    print("\t--sample <int>: Estimate features from a frequency-weighted sample of this many rows, for quick triage")
+    print("\t--seed <int>: The seed for sampling (default: random)")
     print()
     print("Input file should be in format:")
     print("\tpassword, frequency, ... <- Column headers")
     print("\t\"123456\", 1, ...")
     print("\t\"password\", 18, ...")
     print("\t\"matrix\", 14, ...")
-    print("Output will be in JSON format to standard output.")
+    print("Output will be in JSON format to standard output unless an output file is given.")
+    print("When sampling, the estimated standard error of each histogram bucket is added under 'sampleErrors'")
+    print("(or printed to standard error as JSON for binary output).")
+
+
+def finish(instrument, stats):
+    """ Reports final progress and saves a summary of the run, if asked to.
+    Args:
+        instrument (Instrument): The instrument the run was recorded with, or none.
+        stats (str): The file in which to save the summary, or none.
+    """
+    if instrument is None:
+        return
+    if instrument.progress:
+        instrument.report(True)
+    if stats is not None:
+        with open(stats, 'w') as f:
+            json.dump(instrument.summary(), f, indent=2)
+
+
+# Only run when invoked directly, as worker processes may import this module.
+if __name__ == '__main__':
+    # If no options specified, print usage and exit.
+    if len(sys.argv) == 1:
+        print_usage(True)
+        exit(0)
+
+    # If help flag specified, print help and exit.
+    if is_arg_passed('h'):
+        print_help()
+        exit(0)
+
+    # Last parameter is the raw filename.
+    raw_file = sys.argv[-1]
+    if not os.path.isfile(raw_file):
+        print('Raw data file not found.', file=sys.stderr)
+        sys.exit(1)
+
+    # Get output path if one was specified.
+    out = get_valued_arg('o')
+
+    # Get chunk size if one was specified.
+    chunksize = get_int_valued_arg('chunksize')
 
+    # Get number of worker processes if one was specified.
+    jobs = get_int_valued_arg('jobs')
+    if jobs is None:
+        jobs = 1
 
-# If no options specified, print usage and exit.
-if len(sys.argv) == 1:
-    print_usage(True)
-    exit(0)
+    # Get features file to update and whether to checkpoint if specified.
+    update = get_valued_arg('update')
+    checkpoint = is_arg_passed('checkpoint')
 
-# If help flag specified, print help and exit.
-if is_arg_passed('h'):
-    print_help()
-    exit(0)
+    # Get instrumentation options.
+    instrument = None
+    stats = get_valued_arg('stats')
+    if is_arg_passed('progress') or stats is not None:
+        instrument = Instrument(is_arg_passed('progress'))
+    profile = get_valued_arg('profile')
 
-# Last parameter is the raw filename.
-raw_file = sys.argv[-1]
-if not os.path.isfile(raw_file):
-    emit_err('Raw data file not found.')
-    sys.exit(1)
+    # Update features incrementally if asked to, then exit.
+    if update is not None or checkpoint:
+        if update is None:
+            print('A features file to update is needed to use a checkpoint.', file=sys.stderr)
+            sys.exit(1)
+        try:
+            with profiled(profile):
+                update_features(raw_file, update, checkpoint, out, chunksize, jobs, is_arg_passed('joint'),
+                    is_arg_passed('dedupe'), instrument)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            sys.exit(1)
+        finish(instrument, stats)
+        sys.exit(0)
 
-# Load CSV file.
-csv = pd.read_csv(raw_file, error_bad_lines=False, skipinitialspace=True)
+    # Estimate features from a sample if asked to, then exit.
+    sample = get_int_valued_arg('sample')
+    if sample is not None:
+        with profiled(profile):
+            characteristics, errors = sample_features(raw_file, sample, chunksize, is_arg_passed('joint'),
+                get_int_valued_arg('seed'), instrument)
+            with instrument.phase('serialize') if instrument is not None else contextlib.nullcontext():
+                if out is not None and out.endswith('.npz'):
+                    characteristics.save(out)
+                    print(json.dumps({'sampleErrors': errors}), file=sys.stderr)
+                else:
+                    output = characteristics.to_dict()
+                    output['sampleErrors'] = errors
+                    if out is not None:
+                        with open(out, 'w') as f:
+                            json.dump(output, f)
+                    else:
+                        print(json.dumps(output))
+        finish(instrument, stats)
+        sys.exit(0)
 
-# Initialise new characteristics object.
-characteristics = PasswordSetCharacteristics()
+    # Get feature cache if one was specified.
+    cache = None
+    cache_dir = get_valued_arg('cache')
+    if cache_dir is None:
+        cache_dir = os.environ.get('POLINFER_CACHE')
+    if cache_dir is not None:
+        cache_size = get_int_valued_arg('cache-size')
+        if cache_size is None:
+            cache_size = 1024 # Default cache size.
+        cache = FeatureCache(cache_dir, cache_size * 1024 * 1024)
 
-# Load passwords into characteristics object.
-for ind, row in csv.iterrows():
-    characteristics.add(str(row['password']), int(row['frequency']))
+    with profiled(profile):
+        # Stream CSV file into characteristics object.
+        characteristics = extract_features(raw_file, chunksize, jobs, is_arg_passed('joint'), cache=cache,
+            dedupe=is_arg_passed('dedupe'), instrument=instrument)
 
-# Print results as JSON.
-print(json.dumps(characteristics.to_dict()))
+        # Save results to output file, or print them as JSON.
+        with instrument.phase('serialize') if instrument is not None else contextlib.nullcontext():
+            if out is not None:
+                characteristics.save(out)
+            else:
+                print(json.dumps(characteristics.to_dict()))
+    finish(instrument, stats)
@@ -0,0 +1,273 @@
+import os
+import contextlib
+from multiprocessing import Manager
+from concurrent.futures import ProcessPoolExecutor, wait
+
+import numpy as np
+
+from model.PasswordSetCharacteristics import PasswordSetCharacteristics
+
+from charclass import classify_many
+from dumpreader import read_chunks, split_dump, header_size, complete_size
+from instrument import Instrument
+
+
+# The version of feature extraction, to be increased whenever a change would alter the features extracted.
+FEATURE_VERSION = 1
+
+# The number of rows to read per chunk when sampling, unless told otherwise.
+SAMPLE_CHUNKSIZE = 1000000
+
+
+def _read_features (file, chunksize, start, end, joint, dedupe, instrument):
+    """ Extracts features from a password dump in this process, optionally recording progress and phase timings.
+
+    Args:
+        file (str): The path of the CSV file.
+        chunksize (int): The number of rows to read per chunk, or none to read the whole file (or range) at once.
+        start (int): The offset at which to start, which must begin a line, or none to start at the beginning.
+        end (int): The offset at which to stop, which must end a line.
+        joint (bool): Whether to also record joint histograms.
+        dedupe (bool): Whether to classify each distinct password in a chunk only once.
+        instrument (Instrument): The instrument to record progress and phase timings with, or none.
+    Returns:
+        PasswordSetCharacteristics: The features of the passwords read.
+    """
+    # Passwords are read as raw bytes, as ASCII passwords can be classified without ever being decoded.
+    if instrument is None:
+        return PasswordSetCharacteristics.from_chunks(read_chunks(file, chunksize, start, end, binary=True), joint,
+            dedupe)
+    chunks = read_chunks(file, chunksize, start, end, instrument.advance, binary=True)
+    return PasswordSetCharacteristics.from_chunks(instrument.timed(chunks, 'parse', 'classify'), joint, dedupe)
+
+
+def _extract_range (file, start, end, chunksize, joint, dedupe, instrumented, updates):
+    """ Extracts features from a byte range of a password dump, for use in a worker process.
+
+    Args:
+        file (str): The path of the CSV file.
+        start (int): The offset of the first byte in the range.
+        end (int): The offset one past the last byte in the range.
+        chunksize (int): The number of rows to read per chunk, or none to read the whole range at once.
+        joint (bool): Whether to also record joint histograms.
+        dedupe (bool): Whether to classify each distinct password in a chunk only once.
+        instrumented (bool): Whether to record phase timings.
+        updates (Queue): The queue to forward rows read to as they are read, or none.
+    Returns:
+        tuple: The features of the passwords in the range, and the instrument used or none.
+    """
+    instrument = Instrument(updates=updates) if instrumented else None
+    characteristics = _read_features(file, chunksize, start, end, joint, dedupe, instrument)
+    if instrument is not None:
+        instrument.updates = None # Not needed by the parent, which holds the queue itself.
+    return characteristics, instrument
+
+
+def _phase (instrument, name):
+    """ Counts the time spent within the returned context towards a phase of an instrument, if there is one.
+
+    Args:
+        instrument (Instrument): The instrument, or none.
+        name (str): The name of the phase.
+    Returns:
+        context manager: The context.
+    """
+    return contextlib.nullcontext() if instrument is None else instrument.phase(name)
+
+
+@contextlib.contextmanager
+def _updates (instrument):
+    """ Provides a queue within this context for worker processes to forward rows read to as they are read, if an
+    instrument is reporting progress.
+
+    Args:
+        instrument (Instrument): The instrument, or none.
+    """
+    if instrument is None or not instrument.progress:
+        yield None
+        return
+    with Manager() as manager:
+        yield manager.Queue()
+
+
+def extract_features (file, chunksize=None, jobs=1, joint=False, start=None, end=None, cache=None, dedupe=False,
+        instrument=None):
+    """ Extracts features from a password dump formatted as a CSV file.
+
+    With more than one job, the file is split into byte ranges which are processed in parallel by a pool of worker
+    processes, and their results are merged. A single byte range may be given to extract features from only part of
+    the file. Features of whole files are returned from the cache given if present, and stored in it otherwise.
+
+    Args:
+        file (str): The path of the CSV file.
+        chunksize (int): The number of rows to read per chunk, or none to read the whole file (or range) at once.
+        jobs (int): The number of worker processes to use.
+        joint (bool): Whether to also record joint histograms.
+        start (int): The offset at which to start, which must begin a line, or none to start after the header.
+        end (int): The offset at which to stop, which must end a line, or none to stop at the end of the file.
+        cache (FeatureCache): The cache of features to use, or none to always extract features.
+        dedupe (bool): Whether to classify each distinct password in a chunk only once.
+        instrument (Instrument): The instrument to record progress and phase timings with, or none.
+    Returns:
+        PasswordSetCharacteristics: The features of the passwords in the file.
+    """
+    if cache is not None and start is None and end is None:
+        with _phase(instrument, 'cache'):
+            key = cache.key(file, FEATURE_VERSION, joint=joint)
+            characteristics = cache.get(key)
+        if characteristics is None:
+            characteristics = extract_features(file, chunksize, jobs, joint, dedupe=dedupe, instrument=instrument)
+            with _phase(instrument, 'cache'):
+                cache.put(key, characteristics)
+        return characteristics
+    if start is not None and end is None:
+        end = os.path.getsize(file)
+    if instrument is not None:
+        size = os.path.getsize(file) if end is None else end
+        instrument.expect(size - (header_size(file) if start is None else start))
+    if jobs <= 1:
+        return _read_features(file, chunksize, start, end, joint, dedupe, instrument)
+    ranges = split_dump(file, jobs, start, end)
+    characteristics = PasswordSetCharacteristics(joint=joint)
+    with _updates(instrument) as updates, ProcessPoolExecutor(jobs) as pool:
+        futures = [pool.submit(_extract_range, file, start, end, chunksize, joint, dedupe, instrument is not None,
+            updates) for start, end in ranges]
+        pending = futures
+        while len(pending) > 0:
+            done, pending = wait(pending, Instrument.REPORT_INTERVAL)
+            if instrument is not None:
+                instrument.drain(updates)
+        for future in futures:
+            result, worker = future.result()
+            characteristics.merge(result)
+            if worker is not None:
+                instrument.merge(worker)
+    return characteristics
+
+
+def sample_features (file, size, chunksize=None, joint=False, seed=None, instrument=None):
+    """ Estimates the features of a password dump from a frequency-weighted sample of its rows.
+
+    Rows are priority sampled: each is given a priority of its frequency divided by a uniform random number in (0, 1],
+    and the rows of highest priority are kept. Each kept row then stands for its frequency or the highest priority not
+    kept, whichever is larger, which makes the estimate of every histogram bucket unbiased. The variance of each bucket
+    is estimated from the same sample.
+
+    Args:
+        file (str): The path of the CSV file.
+        size (int): The number of rows to sample.
+        chunksize (int): The number of rows to read per chunk, or none to use a default.
+        joint (bool): Whether to also record joint histograms.
+        seed (int): The seed for sampling, or none to seed from the operating system.
+        instrument (Instrument): The instrument to record progress and phase timings with, or none.
+    Returns:
+        tuple: The estimated features, and the estimated standard error of each bucket of each feature with any error,
+            keyed as in `PasswordSetCharacteristics.FEATURES` then by value.
+    """
+    rng = np.random.default_rng(seed)
+    pwds = np.empty(0, dtype=object)
+    freqs = np.empty(0, dtype=np.float64)
+    priorities = np.empty(0, dtype=np.float64)
+    if instrument is not None:
+        instrument.expect(os.path.getsize(file) - header_size(file))
+    chunks = read_chunks(file, SAMPLE_CHUNKSIZE if chunksize is None else chunksize,
+        progress=None if instrument is None else instrument.advance)
+    if instrument is not None:
+        chunks = instrument.timed(chunks, 'parse', 'sample')
+    for chunk_pwds, chunk_freqs in chunks:
+        chunk_freqs = np.asarray(chunk_freqs, dtype=np.float64)
+        pwds = np.concatenate((pwds, np.array(chunk_pwds, dtype=object)))
+        freqs = np.concatenate((freqs, chunk_freqs))
+        priorities = np.concatenate((priorities, chunk_freqs / (1 - rng.random(len(chunk_freqs)))))
+        if len(priorities) > size + 1:
+            keep = np.argpartition(priorities, len(priorities) - size - 1)[-(size + 1):] # One extra for the threshold.
+            pwds, freqs, priorities = pwds[keep], freqs[keep], priorities[keep]
+
+    # Drop the extra row kept, using its priority as the threshold (if there were more rows than the sample size).
+    threshold = 0
+    if len(priorities) > size:
+        lowest = np.argmin(priorities)
+        threshold = priorities[lowest]
+        pwds, freqs = np.delete(pwds, lowest), np.delete(freqs, lowest)
+
+    # Estimate features from the sample, and the variance each row contributes to its buckets.
+    with _phase(instrument, 'classify'):
+        characteristics = PasswordSetCharacteristics(joint=joint)
+        features = classify_many(pwds.tolist())
+        characteristics.add_classified(features, np.maximum(freqs, threshold))
+        variances = threshold * np.maximum(threshold - freqs, 0)
+        errors = {}
+        for key, values in zip(PasswordSetCharacteristics.FEATURES, features):
+            totals = np.sqrt(np.bincount(values, weights=variances)).tolist()
+            errors[key] = {i: error for i, error in enumerate(totals) if error > 0}
+    return characteristics, errors
+
+
+def resume_offset (characteristics, file):
+    """ Gets the offset at which to resume reading a password dump from the checkpoint recorded in its features.
+
+    Args:
+        characteristics (PasswordSetCharacteristics): The features previously extracted from the dump.
+        file (str): The path of the CSV file.
+    Returns:
+        int: The offset up to which the dump has already been read, or none if the features record no usable checkpoint
+            for it (e.g. they were extracted without one, or the dump has since been truncated).
+    """
+    checkpoint = characteristics.checkpoint
+    if checkpoint is None or checkpoint['file'] != os.path.abspath(file):
+        return None
+    if checkpoint['offset'] > os.path.getsize(file):
+        return None
+    return checkpoint['offset']
+
+
+def update_features (file, features, checkpoint=False, out=None, chunksize=None, jobs=1, joint=False, dedupe=False,
+        instrument=None):
+    """ Folds the passwords in a password dump into previously extracted features and saves the result.
+
+    If checkpointing, only lines after the offset recorded in the features are read, and the new offset is saved along
+    with the features in a single atomic write, so rerunning after a crash or after more lines have been appended only
+    processes new data. Whether joint histograms are recorded follows the previous features.
+
+    Args:
+        file (str): The path of the CSV file.
+        features (str): The path of the previously extracted features file, which is treated as empty if missing.
+        checkpoint (bool): Whether to resume from and record the offset up to which the dump has been read.
+        out (str): The path at which to save the updated features, or none to overwrite the previous ones.
+        chunksize (int): The number of rows to read per chunk, or none to read the whole file (or range) at once.
+        jobs (int): The number of worker processes to use.
+        joint (bool): Whether to also record joint histograms, if there are no previous features.
+        dedupe (bool): Whether to classify each distinct password in a chunk only once.
+        instrument (Instrument): The instrument to record progress and phase timings with, or none.
+    Returns:
+        PasswordSetCharacteristics: The updated features.
+    """
+    previous = None
+    if os.path.isfile(features):
+        with _phase(instrument, 'load'):
+            previous = PasswordSetCharacteristics.load(features)
+        if joint and len(previous.joint) == 0:
+            raise ValueError(f'Cannot add joint histograms to {features}, which was extracted without them.')
+        joint = len(previous.joint) > 0
+    start = None
+    end = None
+    if checkpoint:
+        start = header_size(file) if previous is None else resume_offset(previous, file)
+        if start is None:
+            raise ValueError(f'{features} records no checkpoint for {file}, so rows already in it cannot be skipped.')
+        end = complete_size(file) # Don't read lines that are still being appended.
+    characteristics = extract_features(file, chunksize, jobs, joint, start, end, dedupe=dedupe, instrument=instrument)
+    if previous is not None:
+        with _phase(instrument, 'load'):
+            previous.merge(characteristics)
+        characteristics = previous
+    if checkpoint:
+        characteristics.checkpoint = {'file': os.path.abspath(file), 'offset': end}
+    out = features if out is None else out
+
+    # Save via a temporary file, so the features and checkpoint are replaced together if we're interrupted.
+    root, ext = os.path.splitext(out)
+    with _phase(instrument, 'serialize'):
+        characteristics.save(root + '.tmp' + ext)
+    os.replace(root + '.tmp' + ext, out)
+    return characteristics
@@ -0,0 +1,105 @@
+import os
+import hashlib
+
+from model.PasswordSetCharacteristics import PasswordSetCharacteristics
+
+
+class FeatureCache:
+    """ Represents an on-disk cache of extracted features, keyed by the digest of the file they were extracted from.
+
+    Entries are evicted least-recently-used first once the cache grows beyond its size limit.
+    """
+
+    # The size of the blocks in which files are read when computing their digest.
+    BLOCK_SIZE = 1024 * 1024
+
+    def __init__ (self, directory, max_size):
+        """ Constructs a new instance of a feature cache, creating its directory if needed.
+
+        Args:
+            directory (str): The directory in which to store cache entries.
+            max_size (int): The maximum total size of all cache entries, in bytes.
+        """
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def digest (cls, file):
+        """ Computes the digest of the contents of a file.
+
+        Args:
+            file (str): The path of the file.
+        Returns:
+            str: The hexadecimal digest.
+        """
+        hash = hashlib.blake2b(digest_size=20)
+        with open(file, 'rb') as f:
+            for block in iter(lambda: f.read(cls.BLOCK_SIZE), b''):
+                hash.update(block)
+        return hash.hexdigest()
+
+    def key (self, file, version, **options):
+        """ Computes the cache key for the features of a file.
+
+        Args:
+            file (str): The path of the file.
+            version (int): The version of feature extraction, so that entries from older versions are never used.
+            options (dict): Any options that change the features extracted.
+        Returns:
+            str: The cache key.
+        """
+        parts = [self.digest(file), f'v{version}'] + [f'{name}={value}' for name, value in sorted(options.items())]
+        return '-'.join(parts)
+
+    def _path (self, key):
+        """ Gets the path of the cache entry for a key.
+
+        Args:
+            key (str): The cache key.
+        Returns:
+            str: The path of the cache entry.
+        """
+        return os.path.join(self.directory, key + '.npz')
+
+    def get (self, key):
+        """ Gets the features stored under a key, marking them as recently used.
+
+        Args:
+            key (str): The cache key.
+        Returns:
+            PasswordSetCharacteristics: The features, or none if the key is not in the cache.
+        """
+        path = self._path(key)
+        if not os.path.isfile(path):
+            return None
+        os.utime(path) # Record use for eviction.
+        return PasswordSetCharacteristics.load(path)
+
+    def put (self, key, characteristics):
+        """ Stores features under a key, then evicts entries as needed to stay within the size limit.
+
+        Args:
+            key (str): The cache key.
+            characteristics (PasswordSetCharacteristics): The features to store.
+        """
+        path = self._path(key)
+        characteristics.save(path + '.tmp.npz')
+        os.replace(path + '.tmp.npz', path)
+        self.evict()
+
+    def evict (self):
+        """ Removes least recently used entries until the cache is within its size limit.
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith('.npz') and not name.endswith('.tmp.npz'):
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for mtime, size, path in entries)
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            os.remove(path)
+            total -= size
@@ -0,0 +1,135 @@
+import sys
+import random
+
+from charclass import classify
+from policy import Policy, POLICIES
+
+from args import is_arg_passed, get_valued_arg, get_int_valued_arg
+
+
+# Syllables used to build word-like sequences of letters.
+SYLLABLES = ['ba', 'be', 'lo', 'ra', 'mi', 'ne', 'ko', 'tu', 'sa', 'ri', 'an', 'el', 'or', 'is', 'ch', 'st', 'ou']
+
+# Symbols used in generated passwords.
+SYMBOLS = '!@#$%^&*._- '
+
+
+def print_usage(show_help_line=False):
+    """ Prints the short help card for the program.
+    Args:
+        show_help_line (bool): If true, information on help flag `-h` will be printed.
+    """
+    print("Usage: python gendump.py [-h] [-o <outfile>] [-n <rows>] [--seed <int>] [--zipf <exponent>]")
+    print("                         [--policy <spec>] [--noise <fraction>]")
+    print("Generates a synthetic password dump formatted as a CSV file.")
+    if show_help_line:
+        print("For extended help use '-h' option.")
+
+
+def print_help():
+    """ Prints the full help card for the program.
+    """
+    print_usage()
+    print("Options:")
+    print("\t-h: Show this help screen")
+    print("\t-o <str>: The file in which to place output")
+    print("\t-n <int>: The number of distinct passwords to generate (default: 100000)")
+    print("\t--seed <int>: The seed for the random number generator (default: 0)")
+    print("\t--zipf <float>: The exponent of the Zipf distribution of frequencies (default: 1.0)")
+    print("\t--policy <str>: Only output passwords compliant with this policy (default: none)")
+    print("\t--noise <float>: The fraction of non-compliant passwords to output anyway (default: 0)")
+    print()
+    print("Available policies:", ', '.join(POLICIES))
+    print("Output will be in CSV format, with passwords in order of decreasing frequency.")
+
+
+def generate_password(rand):
+    """ Generates a random password built from word-like letter sequences, digits and symbols.
+
+    Args:
+        rand (Random): The random number generator to use.
+    Returns:
+        str: The generated password.
+    """
+    pwd = ''
+    for i in range(0, rand.choice([1, 1, 1, 2, 2, 3])):
+        word = ''.join(rand.choice(SYLLABLES) for j in range(0, rand.randint(1, 4)))
+        shape = rand.random()
+        if shape < 0.15:
+            word = word.capitalize()
+        elif shape < 0.2:
+            word = word.upper()
+        if rand.random() < 0.2:
+            word += rand.choice(SYMBOLS)
+        pwd += word
+    if rand.random() < 0.6:
+        pwd += str(rand.randint(0, 10 ** rand.randint(1, 6)))
+    if rand.random() < 0.05:
+        pwd = str(rand.randint(0, 10 ** rand.randint(3, 10))) # Some passwords are just numbers.
+    return pwd
+
+
+def generate_dump(out, rows, seed=0, zipf=1.0, policy='none', noise=0):
+    """ Generates a synthetic password dump with Zipf-distributed frequencies.
+
+    Args:
+        out (file): The file in which to place output.
+        rows (int): The number of distinct passwords to generate.
+        seed (int): The seed for the random number generator.
+        zipf (float): The exponent of the Zipf distribution of frequencies.
+        policy (str): The specification of the policy that passwords must comply with, as accepted by `Policy.parse`.
+        noise (float): The fraction of non-compliant passwords to output anyway.
+    """
+    rand = random.Random(seed)
+    policy = Policy.parse(policy)
+    seen = set()
+    top = max(1, rows // 50) # Frequency of the most common password.
+    out.write('password, frequency\n')
+    buffer = []
+    while len(seen) < rows:
+        pwd = generate_password(rand)
+        if pwd in seen or not (policy.complies(classify(pwd)) or rand.random() < noise):
+            continue
+        seen.add(pwd)
+        freq = max(1, round(top / len(seen) ** zipf))
+        buffer.append('"' + pwd.replace('"', '""') + '", ' + str(freq) + '\n')
+        if len(buffer) >= 10000:
+            out.write(''.join(buffer))
+            buffer = []
+    out.write(''.join(buffer))
+
+
+# Only run when invoked directly, as the benchmark suite imports this module.
+if __name__ == '__main__':
+    # If help flag specified, print help and exit.
+    if is_arg_passed('h'):
+        print_help()
+        exit(0)
+
+    # Read in options, applying defaults.
+    out = get_valued_arg('o')
+    rows = get_int_valued_arg('n')
+    if rows is None:
+        rows = 100000
+    seed = get_int_valued_arg('seed')
+    if seed is None:
+        seed = 0
+    zipf = get_valued_arg('zipf')
+    zipf = 1.0 if zipf is None else float(zipf)
+    policy = get_valued_arg('policy')
+    if policy is None:
+        policy = 'none'
+    try:
+        Policy.parse(policy)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    noise = get_valued_arg('noise')
+    noise = 0 if noise is None else float(noise)
+
+    # Generate dump.
+    if out is None:
+        generate_dump(sys.stdout, rows, seed, zipf, policy, noise)
+    else:
+        with open(out, 'w') as f:
+            generate_dump(f, rows, seed, zipf, policy, noise)
@@ -0,0 +1,379 @@
+import math
+from functools import reduce
+
+import numpy as np
+
+from model.PasswordSetCharacteristics import PasswordSetCharacteristics
+
+
+def max_key(dict):
+    """ Returns the maximum key in an integer-keyed dictionary.
+
+    Args:
+        dict (dict): The integer-keyed dictionary.
+    Returns:
+        int: The maximum key.
+    """
+    output = 0
+    for key, value in dict.items():
+        output = max(output, int(key))
+    return output
+
+
+def to_points(dict):
+    """ Turns a dictionary of lengths into coordinate pairs.
+
+    Args:
+        dict (dict): The length frequency dictionary.
+    Returns:
+        list of tuple: The coordinate pairs.
+    """
+    points = []
+    for i in range(0, max_key(dict) + 1):
+        if i in dict:
+            points.append((i, dict[i]))
+        else:
+            points.append((i, 0))
+    return points
+
+
+def compute_deltas(points, inverse=False):
+    """ Computes the ratio between the frequencies of each pair of consecutive points.
+
+    Args:
+        points (list of tuple): The coordinate pairs.
+        inverse (bool): Whether the points are inverse cumulative frequencies.
+    Returns:
+        list of tuple: The value of the first point in each pair, paired with the ratio.
+    """
+    deltas = []
+    for i in range(0, len(points) - 1):
+        j = points[i]
+        k = points[i + 1]
+        if inverse:
+            mult = math.inf if k[1] == 0 else j[1] / k[1]
+        else:
+            mult = math.inf if j[1] == 0 else k[1] / j[1]
+        deltas.append((j[0], mult))
+    return deltas
+
+
+def find_constraint(deltas, outlier_threshold, inverse=False):
+    """ Finds the constraint suggested by the largest delta, if it is an outlier.
+
+    Args:
+        deltas (list of tuple): The deltas, as computed by `compute_deltas`.
+        outlier_threshold (float): The threshold above which a delta is considered an outlier.
+        inverse (bool): Whether the deltas were computed from inverse cumulative frequencies.
+    Returns:
+        int: The inferred constraint, or none if no constraint is likely to be present.
+    """
+    if len(deltas) == 0:
+        return None
+    largest = reduce(lambda i, j: i if i[1] > j[1] else j, deltas)
+    if largest[1] < outlier_threshold:
+        return None
+    return largest[0] + (0 if inverse else 1) # Offset needs to change if we're finding upper bounds.
+
+
+def find_constraints(counts, accum=True, inverse=False, low_lim=1, high_lim=20, outlier_threshold=2):
+    """ Finds the constraint on a feature suggested by each of many histograms at once.
+
+    Each histogram gives the same result `infer_constraint` would, with ties between the largest deltas going to the
+    last, but deltas for all histograms are computed in one pass.
+
+    Args:
+        counts (ndarray): The histograms, one per row, each indexed by value.
+        accum (bool): Whether or not to use cumulative frequencies.
+        inverse (bool): Whether to use inverse cumulative frequencies, inferring an upper rather than lower constraint.
+        low_lim (int): The lower limit of the feature to use.
+        high_lim (int): The upper limit of the feature to use.
+        outlier_threshold (float): The threshold above which a delta is considered an outlier.
+    Returns:
+        ndarray: The inferred constraint for each histogram, or -1 where no constraint is likely to be present.
+    """
+    counts = np.atleast_2d(counts)
+    if counts.shape[1] < 2:
+        return np.full(len(counts), -1) # Fewer than two points, so no deltas.
+    if accum and inverse:
+        values = np.cumsum(counts[:, ::-1], axis=1)[:, ::-1]
+    elif accum:
+        values = np.cumsum(counts, axis=1)
+    else:
+        values = counts
+
+    # Points run up to the last value in each histogram, or its last nonzero count if not cumulative.
+    if accum:
+        last = np.full(len(counts), counts.shape[1] - 1)
+    else:
+        last = counts.shape[1] - 1 - np.argmax(counts[:, ::-1] != 0, axis=1)
+
+    # Compute all deltas, then discard those with either point outside the limits.
+    first, second = values[:, :-1], values[:, 1:]
+    numerator, denominator = (first, second) if inverse else (second, first)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        deltas = np.where(denominator == 0, np.inf, numerator / np.where(denominator == 0, 1, denominator))
+    xs = np.arange(0, counts.shape[1] - 1)
+    valid = (xs >= low_lim) & (xs + 1 <= high_lim) & (xs[np.newaxis, :] + 1 <= last[:, np.newaxis])
+    deltas = np.where(valid, deltas, -np.inf)
+
+    # Take the last of the largest deltas, as `find_constraint` does.
+    largest = deltas.shape[1] - 1 - np.argmax(deltas[:, ::-1], axis=1)
+    scores = deltas[np.arange(len(deltas)), largest]
+    return np.where(scores >= outlier_threshold, largest + (0 if inverse else 1), -1)
+
+
+def get_points(characteristics, key, accum=True, inverse=False, low_lim=1, high_lim=20):
+    """ Gets the coordinate pairs for a feature within limits.
+
+    Args:
+        characteristics (PasswordSetCharacteristics): The characteristics of the password set.
+        key (str): The key of the feature to use.
+        accum (bool): Whether or not to use cumulative frequencies.
+        inverse (bool): Whether to use inverse cumulative frequencies.
+        low_lim (int): The lower limit of the feature to use.
+        high_lim (int): The upper limit of the feature to use.
+    Returns:
+        list of tuple: The coordinate pairs.
+    """
+    points = to_points(characteristics.get(key, accum, inverse))
+    return list(filter(lambda p: p[0] >= low_lim and p[0] <= high_lim, points)) # Enforce limits.
+
+
+def infer_constraint(characteristics, key, accum=True, inverse=False, low_lim=1, high_lim=20, outlier_threshold=2):
+    """ Infers a lower or upper constraint on a feature of a password set.
+
+    Args:
+        characteristics (PasswordSetCharacteristics): The characteristics of the password set.
+        key (str): The key of the feature to use.
+        accum (bool): Whether or not to use cumulative frequencies.
+        inverse (bool): Whether to use inverse cumulative frequencies, inferring an upper rather than lower constraint.
+        low_lim (int): The lower limit of the feature to use.
+        high_lim (int): The upper limit of the feature to use.
+        outlier_threshold (float): The threshold above which a delta is considered an outlier.
+    Returns:
+        int: The inferred constraint, or none if no constraint is likely to be present.
+    """
+    points = get_points(characteristics, key, accum, inverse, low_lim, high_lim)
+    return find_constraint(compute_deltas(points, inverse), outlier_threshold, inverse)
+
+
+def bootstrap_constraint(characteristics, key, replicates=1000, accum=True, inverse=False, low_lim=1, high_lim=20,
+        outlier_threshold=2, seed=None):
+    """ Infers a lower or upper constraint on a feature of a password set, with its stability under resampling.
+
+    Replicate histograms are drawn from a multinomial distribution over the histogram of the feature, with as many
+    passwords in total, and the constraint is inferred from each.
+
+    Args:
+        characteristics (PasswordSetCharacteristics): The characteristics of the password set.
+        key (str): The key of the feature to use.
+        replicates (int): The number of replicate histograms to draw.
+        accum (bool): Whether or not to use cumulative frequencies.
+        inverse (bool): Whether to use inverse cumulative frequencies, inferring an upper rather than lower constraint.
+        low_lim (int): The lower limit of the feature to use.
+        high_lim (int): The upper limit of the feature to use.
+        outlier_threshold (float): The threshold above which a delta is considered an outlier.
+        seed (int): The seed for drawing replicates, or none to seed from the operating system.
+    Returns:
+        dict: The constraint inferred from the password set itself, how many replicates inferred each constraint (`none`
+            counting those inferring no constraint), the fraction of replicates agreeing with the password set (its
+            stability) and the central 95% interval of constraints inferred by replicates, if any inferred one.
+    """
+    constraint = infer_constraint(characteristics, key, accum, inverse, low_lim, high_lim, outlier_threshold)
+    counts = characteristics.get_array(key)
+    total = int(counts.sum())
+    if total > 0:
+        samples = np.random.default_rng(seed).multinomial(total, counts / total, size=replicates)
+    else:
+        samples = np.zeros((replicates, len(counts)), dtype=np.int64)
+    constraints = find_constraints(samples, accum, inverse, low_lim, high_lim, outlier_threshold)
+    values, freqs = np.unique(constraints, return_counts=True)
+    inferred = np.sort(constraints[constraints >= 0])
+    interval = None
+    if len(inferred) > 0:
+        interval = [int(inferred[int(0.025 * (len(inferred) - 1))]),
+            int(inferred[math.ceil(0.975 * (len(inferred) - 1))])]
+    return {
+        'constraint': constraint,
+        'distribution': {('none' if value < 0 else str(value)): freq
+            for value, freq in zip(values.tolist(), freqs.tolist())},
+        'stability': float(np.mean(constraints == (-1 if constraint is None else constraint))),
+        'interval': interval
+    }
+
+
+class ConstraintScanner:
+    """ Answers many constraint inference queries over the features of a password set quickly.
+
+    Prefix sums of each histogram, and the deltas between the frequencies of consecutive values in each mode, are
+    computed once up front. Each query then only scans the deltas within its limits, so sweeping thousands of limits,
+    thresholds and modes costs little more than reading the features file.
+    """
+
+    # The modes constraints can be inferred in, mapped to whether each uses cumulative and inverse frequencies.
+    MODES = {
+        'cumulative': (True, False),
+        'inverse': (True, True),
+        'raw': (False, False),
+        'rawinverse': (False, True)
+    }
+
+    def __init__(self, characteristics):
+        """ Constructs a new scanner over the features of a password set.
+
+        Args:
+            characteristics (PasswordSetCharacteristics): The characteristics of the password set.
+        """
+        self._deltas = {}
+        for key in PasswordSetCharacteristics.FEATURES:
+            counts = characteristics.get_array(key).astype(np.float64)
+            prefix = np.cumsum(counts)
+            suffix = prefix[-1] - prefix + counts if len(counts) > 0 else counts # Sums from each value up.
+            nonzero = np.flatnonzero(counts)
+            for accum, inverse in self.MODES.values():
+                values = (suffix if inverse else prefix) if accum else counts
+                first, second = values[:-1], values[1:]
+                numerator, denominator = (first, second) if inverse else (second, first)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    deltas = np.where(denominator == 0, np.inf, numerator / np.where(denominator == 0, 1, denominator))
+
+                # Points run up to the last value, or the last nonzero frequency if not cumulative.
+                last = len(counts) - 1 if accum else (nonzero[-1] if len(nonzero) > 0 else 0)
+                self._deltas[key, accum, inverse] = (deltas, int(last))
+
+    def largest_delta(self, key, accum=True, inverse=False, low_lim=1, high_lim=20):
+        """ Finds the largest delta within limits, taking the last of any ties as `find_constraint` does.
+
+        Args:
+            key (str): The key of the feature to use.
+            accum (bool): Whether or not to use cumulative frequencies.
+            inverse (bool): Whether to use inverse cumulative frequencies.
+            low_lim (int): The lower limit of the feature to use.
+            high_lim (int): The upper limit of the feature to use.
+        Returns:
+            tuple: The value of the first point of the largest delta paired with the delta, or none if there are none.
+        """
+        deltas, last = self._deltas[key, accum, inverse]
+        start = max(low_lim, 0)
+        window = deltas[start:max(min(high_lim, last), 0)] # Both points of each delta must be within limits.
+        if len(window) == 0:
+            return None
+        i = len(window) - 1 - int(np.argmax(window[::-1]))
+        return start + i, float(window[i])
+
+    def infer_constraint(self, key, accum=True, inverse=False, low_lim=1, high_lim=20, outlier_threshold=2):
+        """ Infers a lower or upper constraint on a feature, exactly as `infer_constraint` would.
+
+        Args:
+            key (str): The key of the feature to use.
+            accum (bool): Whether or not to use cumulative frequencies.
+            inverse (bool): Whether to use inverse cumulative frequencies, inferring an upper rather than lower constraint.
+            low_lim (int): The lower limit of the feature to use.
+            high_lim (int): The upper limit of the feature to use.
+            outlier_threshold (float): The threshold above which a delta is considered an outlier.
+        Returns:
+            int: The inferred constraint, or none if no constraint is likely to be present.
+        """
+        largest = self.largest_delta(key, accum, inverse, low_lim, high_lim)
+        if largest is None or largest[1] < outlier_threshold:
+            return None
+        return largest[0] + (0 if inverse else 1)
+
+    def sweep(self, keys, modes, low_lims, high_lims, outlier_thresholds):
+        """ Infers constraints over every combination of features, modes, limits and thresholds.
+
+        The largest delta is found once per feature, mode and pair of limits, then compared against every threshold.
+
+        Args:
+            keys (list of str): The keys of the features to use.
+            modes (list of str): The modes to use, as named in `MODES`.
+            low_lims (list of int): The lower limits to use.
+            high_lims (list of int): The upper limits to use.
+            outlier_thresholds (list of float): The thresholds to use.
+        Returns:
+            generator of tuple: The feature, mode, lower limit, upper limit, threshold, inferred constraint (or none) and
+                largest delta (or none if there are no deltas within limits) of each combination.
+        """
+        for key in keys:
+            for mode in modes:
+                accum, inverse = self.MODES[mode]
+                for low_lim in low_lims:
+                    for high_lim in high_lims:
+                        largest = self.largest_delta(key, accum, inverse, low_lim, high_lim)
+                        for threshold in outlier_thresholds:
+                            constraint = None
+                            if largest is not None and largest[1] >= threshold:
+                                constraint = largest[0] + (0 if inverse else 1)
+                            yield key, mode, low_lim, high_lim, threshold, constraint, \
+                                None if largest is None else largest[1]
+
+
+def infer_policy(characteristics, accum=True, low_lim=1, high_lim=20, outlier_threshold=2, replicates=None,
+        seed=None):
+    """ Infers lower and upper constraints on every feature of a password set.
+
+    Args:
+        characteristics (PasswordSetCharacteristics): The characteristics of the password set.
+        accum (bool): Whether or not to use cumulative frequencies.
+        low_lim (int): The lower limit of the features to use.
+        high_lim (int): The upper limit of the features to use.
+        outlier_threshold (float): The threshold above which a delta is considered an outlier.
+        replicates (int): The number of replicates to bootstrap each constraint with, or none to not bootstrap.
+        seed (int): The seed for drawing replicates, or none to seed from the operating system.
+    Returns:
+        dict: The inferred constraints, keyed by feature then `lower` or `upper`, with none where no constraint is likely.
+            If bootstrapping, each constraint is given as returned by `bootstrap_constraint` instead.
+    """
+    policy = {}
+    for key in PasswordSetCharacteristics.FEATURES:
+        policy[key] = {}
+        for term, inverse in (('lower', False), ('upper', True)):
+            if replicates is None:
+                policy[key][term] = infer_constraint(characteristics, key, accum, inverse, low_lim, high_lim,
+                    outlier_threshold)
+            else:
+                policy[key][term] = bootstrap_constraint(characteristics, key, replicates, accum, inverse, low_lim,
+                    high_lim, outlier_threshold, seed)
+    return policy
+
+
+def infer_joint_constraint(characteristics, pair, low_lim=1, high_lim=20, outlier_threshold=2):
+    """ Infers a conjunctive lower constraint on a pair of features of a password set (e.g. length at least 8 and at
+    least 2 character classes).
+
+    Every candidate pair of bounds within the limits is scored by the smaller of the two cumulative frequency deltas
+    across its boundaries, each taken only over passwords meeting the other bound. The best-scoring candidate is
+    inferred if that score is an outlier. A boundary with no passwords at all just outside it, as a strictly enforced
+    policy would leave, is scored as though one password were there. This rewards it by the number of passwords it
+    holds rather than with the infinite delta of `compute_deltas`, as boundaries that no password could ever be just
+    outside (e.g. lengths too short to hold that many classes) would otherwise outscore the policy. Ties go to the last
+    candidate, which holds the tightest bounds.
+
+    Args:
+        characteristics (PasswordSetCharacteristics): The characteristics of the password set, with joint histograms.
+        pair (tuple of str): The keys of the pair of features to use.
+        low_lim (int): The lower limit of both features to use.
+        high_lim (int): The upper limit of both features to use.
+        outlier_threshold (float): The threshold above which a delta is considered an outlier.
+    Returns:
+        tuple of int: The inferred lower bound on each feature, or none if no conjunctive constraint is likely.
+    """
+    counts = characteristics.joint[tuple(pair)].to_dense(high_lim, high_lim)
+
+    # Cumulative frequencies of each feature over passwords with at least each value of the other.
+    x_cum = np.cumsum(np.cumsum(counts[:, ::-1], axis=1)[:, ::-1], axis=0) # Indexed by x upper, y lower bound.
+    y_cum = np.cumsum(np.cumsum(counts[::-1, :], axis=0)[::-1, :], axis=1) # Indexed by x lower, y upper bound.
+
+    # Score each candidate pair of bounds within the limits.
+    bounds = range(low_lim + 1, high_lim + 1)
+    best = None
+    for x in bounds:
+        for y in bounds:
+            score = min(x_cum[x, y] / max(x_cum[x - 1, y], 1), y_cum[x, y] / max(y_cum[x, y - 1], 1))
+            if best is None or score >= best[2]:
+                best = (x, y, score)
+
+    if best is None or best[2] < outlier_threshold:
+        return None
+    return best[0], best[1]
@@ -0,0 +1,192 @@
+import sys
+import time
+import cProfile
+import contextlib
+
+try:
+    import resource
+except ImportError:
+    resource = None # Not available on Windows.
+
+
+def peak_memory ():
+    """ Gets the peak resident memory of this process, or of its largest finished child process if that is larger.
+
+    Returns:
+        int: The peak resident memory in bytes, or none if it can't be measured on this platform.
+    """
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak * (1 if sys.platform == 'darwin' else 1024) # Kilobytes, except on macOS.
+
+
+def format_duration (seconds):
+    """ Formats a duration as hours, minutes and seconds.
+
+    Args:
+        seconds (float): The duration in seconds.
+    Returns:
+        str: The formatted duration.
+    """
+    seconds = int(seconds)
+    return f'{seconds // 3600}:{seconds // 60 % 60:02}:{seconds % 60:02}'
+
+
+@contextlib.contextmanager
+def profiled (file):
+    """ Profiles the code run within this context, dumping the statistics to a file readable by `pstats`.
+
+    Args:
+        file (str): The path of the file in which to dump statistics, or none to not profile.
+    """
+    if file is None:
+        yield
+        return
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(file)
+
+
+class Instrument:
+    """ Records the progress of a long-running extraction and the time spent in each of its phases.
+
+    Progress is measured in bytes read, so an estimate of the time remaining is available before the number of rows is
+    known. Instruments hold no open resources, so they can be returned from worker processes and merged.
+    """
+
+    # The minimum number of seconds between progress reports.
+    REPORT_INTERVAL = 1.0
+
+    def __init__ (self, progress=False, updates=None):
+        """ Constructs a new instrument.
+
+        Args:
+            progress (bool): Whether to report progress to standard error.
+            updates (Queue): The queue to forward rows read to instead of counting them, for an instrument in a worker
+                process whose parent reports progress, or none.
+        """
+        self.progress = progress
+        self.updates = updates
+        self.rows = 0
+        self.done = 0
+        self.total = 0
+        self.phases = {}
+        self._start = time.perf_counter()
+        self._reported = self._start
+
+    def expect (self, size):
+        """ Adds to the number of bytes expected to be read.
+
+        Args:
+            size (int): The number of bytes.
+        """
+        self.total += size
+
+    @contextlib.contextmanager
+    def phase (self, name):
+        """ Counts the time spent within this context towards a phase.
+
+        Args:
+            name (str): The name of the phase.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0) + time.perf_counter() - start
+
+    def timed (self, items, produce, consume):
+        """ Wraps an iterable, counting time spent producing each item towards one phase and consuming it another.
+
+        Args:
+            items (iterable): The items, none of which may be none.
+            produce (str): The name of the phase to count time spent producing items towards.
+            consume (str): The name of the phase to count time spent consuming items towards.
+        Returns:
+            generator: The items.
+        """
+        items = iter(items)
+        while True:
+            with self.phase(produce):
+                item = next(items, None)
+            if item is None:
+                return
+            with self.phase(consume):
+                yield item
+
+    def advance (self, rows, size):
+        """ Records that more rows have been read, reporting progress if it is due.
+
+        Args:
+            rows (int): The number of rows read.
+            size (int): The number of bytes read.
+        """
+        if self.updates is not None:
+            self.updates.put((rows, size)) # Counted by the parent as they arrive.
+            return
+        self.rows += rows
+        self.done += size
+        now = time.perf_counter()
+        if self.progress and now - self._reported >= self.REPORT_INTERVAL:
+            self._reported = now
+            self.report()
+
+    def drain (self, updates):
+        """ Records the rows read that have been forwarded to a queue by instruments in worker processes.
+
+        Args:
+            updates (Queue): The queue, or none.
+        """
+        while updates is not None and not updates.empty():
+            self.advance(*updates.get())
+
+    def merge (self, other):
+        """ Adds the rows read and time spent in each phase recorded by another instrument into this one.
+
+        Args:
+            other (Instrument): The instrument, typically returned from a worker process.
+        """
+        for name, seconds in other.phases.items():
+            self.phases[name] = self.phases.get(name, 0) + seconds
+        self.advance(other.rows, other.done)
+
+    def report (self, final=False):
+        """ Reports progress to standard error, overwriting the previous report if standard error is a terminal.
+
+        Args:
+            final (bool): Whether this is the last report, which is always ended with a newline.
+        """
+        elapsed = time.perf_counter() - self._start
+        line = f'{self.rows:,} rows, {self.rows / elapsed if elapsed > 0 else 0:,.0f} rows/s'
+        if self.total > 0 and not final:
+            line += f', {min(self.done / self.total, 1):.1%}'
+            if self.done > 0:
+                line += f', ETA {format_duration(elapsed * max(self.total - self.done, 0) / self.done)}'
+        else:
+            line += f', {format_duration(elapsed)} elapsed'
+        end = '\r' if sys.stderr.isatty() and not final else '\n'
+        print(line.ljust(72), end=end, file=sys.stderr, flush=True)
+
+    def summary (self):
+        """ Summarizes the rows read, time spent in each phase and peak memory use for JSON serialization.
+
+        Time spent in worker processes is summed across them, so phases may add up to more than the elapsed time.
+
+        Returns:
+            dict: The summary.
+        """
+        elapsed = time.perf_counter() - self._start
+        return {
+            'rows': self.rows,
+            'bytes': self.done,
+            'seconds': elapsed,
+            'rowsPerSecond': self.rows / elapsed if elapsed > 0 else None,
+            'phases': dict(self.phases),
+            'peakRssBytes': peak_memory()
+        }
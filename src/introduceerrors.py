@@ -1,13 +1,20 @@
-import pandas as pd
+import re
 import sys
 
+import numpy as np
+
+from args import is_arg_passed, get_valued_arg, get_int_valued_arg
+from dumpreader import read_chunks, write_pairs
+
 
 def print_usage(show_help_line=False):
     """ Prints the short help card for the program.
     Args:
         show_help_line (bool): If true, information on help flag `-h` will be printed.
     """
-    print("Usage: python introduceerrors.py [-h] <dumpfile>")
+    print("Usage: python introduceerrors.py [-h] [-o <outfile>] [--chunksize <rows>] [--tokens <chars>]")
+    print("                                 [--truncate <length>] [--mangle] [--rate <fraction>] [--seed <int>]")
+    print("                                 <dumpfile>")
     print("Introduces errors to a password dump formatted as a CSV file.")
     if show_help_line:
         print("For extended help use '-h' option.")
@@ -21,27 +28,106 @@ def print_help():
     print('\tdumpfile: The file to introduce error into')
     print("Options:")
     print("\t-h: Show this help screen")
+    print("\t-o <str>: The file in which to place output")
+    print("\t--chunksize <int>: Stream the file in chunks of this many rows to bound memory use")
+    print("\t--tokens <str>: The characters to split passwords along (default: space and comma)")
+    print("\t--truncate <int>: Truncate passwords to this many characters, as a fixed-width column would")
+    print("\t--mangle: Mangle non-ASCII characters by decoding UTF-8 as Latin-1, as a misconfigured import would")
+    print("\t--rate <float>: The fraction of occurrences of each password to introduce errors into (default: 1)")
+    print("\t--seed <int>: The seed for choosing occurrences to introduce errors into (default: 0)")
     print()
     print("Input file should be in CSV frequency distribution format:")
     print("\tpassword, frequency, ... <- Column headers")
     print("\t\"123456\", 1, ...")
     print("\t\"password\", 18, ...")
     print("\t\"matrix\", 14, ...")
-    print("Output will be in CSV format to standard output.")
+    print("Output will be in CSV format to standard output unless an output file is given.")
     print()
-    print("Any passwords containing commas or spaces will be split into multiple records.")
+    print("Any passwords containing split tokens will be split into multiple records. Records that end up identical")
+    print("are output once with their frequencies summed (within each chunk, if streaming in chunks).")
+
+
+def corrupt (pwd, splitter, truncate=None, mangle=False):
+    """ Introduces errors into a password, as a faulty export or import of a password dump would.
+
+    Args:
+        pwd (str): The password.
+        splitter (Pattern): The pattern matching split tokens, or none to not split.
+        truncate (int): The number of characters to truncate each fragment to, or none to not truncate.
+        mangle (bool): Whether to mangle non-ASCII characters by decoding UTF-8 as Latin-1.
+    Returns:
+        list of str: The fragments the password ends up as.
+    """
+    if mangle:
+        pwd = pwd.encode('utf-8', 'surrogateescape').decode('latin-1')
+    fragments = splitter.split(pwd) if splitter is not None else [pwd]
+    if truncate is not None:
+        fragments = [fragment[:truncate] for fragment in fragments]
+    return fragments
+
+
+def introduce_errors (chunks, tokens=' ,', truncate=None, mangle=False, rate=1, seed=0):
+    """ Introduces errors into a stream of chunks of passwords and their frequencies.
+
+    Fragments within each chunk are aggregated, so each is output once per chunk with its frequencies summed. With a
+    rate below one, the number of occurrences of each password to introduce errors into is drawn from a binomial
+    distribution, and the rest are output unchanged.
+
+    Args:
+        chunks (iterable of tuple): The chunks, each a list of passwords and a list of their frequencies.
+        tokens (str): The characters to split passwords along.
+        truncate (int): The number of characters to truncate each fragment to, or none to not truncate.
+        mangle (bool): Whether to mangle non-ASCII characters by decoding UTF-8 as Latin-1.
+        rate (float): The fraction of occurrences of each password to introduce errors into.
+        seed (int): The seed for choosing occurrences to introduce errors into.
+    Returns:
+        generator of tuple: The fragment and frequency of each output row.
+    """
+    splitter = re.compile('[' + re.escape(tokens) + ']') if tokens else None
+    rng = np.random.default_rng(seed)
+    for pwds, freqs in chunks:
+        corrupted = freqs if rate >= 1 else rng.binomial(freqs, rate).tolist()
+        totals = {}
+        for pwd, freq, count in zip(pwds, freqs, corrupted):
+            if count < freq:
+                totals[pwd] = totals.get(pwd, 0) + freq - count
+            if count > 0:
+                for fragment in corrupt(pwd, splitter, truncate, mangle):
+                    totals[fragment] = totals.get(fragment, 0) + count
+        yield from totals.items()
+
+
+# Only run when invoked directly, as the benchmark suite imports this module.
+if __name__ == '__main__':
+    # If no options specified, print usage and exit.
+    if len(sys.argv) == 1:
+        print_usage(True)
+        exit(0)
 
+    # If help flag specified, print help and exit.
+    if is_arg_passed('h'):
+        print_help()
+        exit(0)
 
-# Read in CSV file.
-df = pd.read_csv(sys.argv[-1], skipinitialspace=True)
+    # Get output path and chunk size if specified.
+    out = get_valued_arg('o')
+    chunksize = get_int_valued_arg('chunksize')
 
-# Print header.
-print('password, frequency')
+    # Read in error options, applying defaults.
+    tokens = get_valued_arg('tokens')
+    if tokens is None:
+        tokens = ' ,'
+    truncate = get_int_valued_arg('truncate')
+    rate = get_valued_arg('rate')
+    rate = 1 if rate is None else float(rate)
+    seed = get_int_valued_arg('seed')
+    if seed is None:
+        seed = 0
 
-# For each row in dump.
-for index, row in df.iterrows():
-  fragments = row['password'].split(' ')
-  fragments = list(map(lambda x: x.split(','), fragments)) # Split along spaces and commas.
-  fragments = [item for sublist in fragments for item in sublist] # Flatten list.
-  for fragment in fragments:
-    print('"' + fragment.replace('"', '""') + '",', row['frequency']) # Output row.
+    # Stream rows in dump through error models into output.
+    rows = introduce_errors(read_chunks(sys.argv[-1], chunksize), tokens, truncate, is_arg_passed('mangle'), rate, seed)
+    if out is None:
+        write_pairs(sys.stdout.buffer, rows)
+    else:
+        with open(out, 'wb') as f:
+            write_pairs(f, rows)
@@ -0,0 +1,94 @@
+import numpy as np
+
+class JointHistogram:
+    """ Represents a sparse histogram over pairs of feature values.
+
+    Each pair is packed into a single integer key, so memory use is bounded by the number of distinct pairs seen
+    rather than by the range of values.
+    """
+
+    # The number of bits the first value in each pair is shifted by when packed.
+    SHIFT = 32
+
+    __slots__ = ('_counts',)
+
+    def __init__ (self):
+        """ Constructs a new, empty joint histogram.
+        """
+        self._counts = {}
+
+    @classmethod
+    def from_array (cls, rows):
+        """ Creates a joint histogram from an array of rows.
+
+        Args:
+            rows (list of list): The rows, each holding a first value, second value and count.
+        Returns:
+            JointHistogram: The created histogram.
+        """
+        obj = cls()
+        for x, y, freq in rows:
+            obj.add(int(x), int(y), int(freq))
+        return obj
+
+    def to_array (self):
+        """ Transforms this histogram into an array of rows, sorted by first value then second value.
+
+        Returns:
+            ndarray: The rows, each holding a first value, second value and count.
+        """
+        keys = np.array(sorted(self._counts), dtype=np.int64)
+        rows = np.zeros((len(keys), 3), dtype=np.int64)
+        rows[:, 0] = keys >> self.SHIFT
+        rows[:, 1] = keys & ((1 << self.SHIFT) - 1)
+        rows[:, 2] = [self._counts[key] for key in keys.tolist()]
+        return rows
+
+    def to_dense (self, x_max, y_max):
+        """ Transforms this histogram into a dense two-dimensional array of counts indexed by value.
+
+        Values above the maximums given are counted in one extra final row or column, so that totals are preserved.
+
+        Args:
+            x_max (int): The largest first value to index individually.
+            y_max (int): The largest second value to index individually.
+        Returns:
+            ndarray: The counts.
+        """
+        dense = np.zeros((x_max + 2, y_max + 2), dtype=np.int64)
+        rows = self.to_array()
+        np.add.at(dense, (np.minimum(rows[:, 0], x_max + 1), np.minimum(rows[:, 1], y_max + 1)), rows[:, 2])
+        return dense
+
+    def add (self, x, y, freq):
+        """ Records a pair of values.
+
+        Args:
+            x (int): The first value.
+            y (int): The second value.
+            freq (int): The frequency of the pair.
+        """
+        key = (x << self.SHIFT) | y
+        self._counts[key] = self._counts.get(key, 0) + freq
+
+    def add_many (self, xs, ys, weights):
+        """ Records many pairs of values at once.
+
+        Args:
+            xs (ndarray): The first value of each pair.
+            ys (ndarray): The second value of each pair.
+            weights (ndarray): The frequency of each pair.
+        """
+        keys, inverse = np.unique((xs.astype(np.int64) << self.SHIFT) | ys, return_inverse=True)
+        totals = np.rint(np.bincount(inverse, weights=weights)).astype(np.int64)
+        for key, freq in zip(keys.tolist(), totals.tolist()):
+            self._counts[key] = self._counts.get(key, 0) + freq
+
+    def merge (self, other):
+        """ Adds all pairs recorded in another joint histogram into this one.
+
+        Args:
+            other (JointHistogram): The histogram to merge into this one.
+        """
+        for key, freq in other._counts.items():
+            self._counts[key] = self._counts.get(key, 0) + freq
@@ -1,21 +1,100 @@
 import json
+from array import array
+
+import numpy as np
+
+from charclass import classify_cached, classify_many
+from model.JointHistogram import JointHistogram
 
-from charclass import count_classes, count_words, count_lowers, count_uppers, count_digits, count_symbols
 
 class PasswordSetCharacteristics:
     """ Represents the characteristics of a set of passwords.
+
+    Each feature is held as a histogram in a growable array of counts, indexed by feature value.
     """
 
-    def __init__ (self):
+    # The key of each feature when serialized, mapped to the attribute holding it.
+    FEATURES = {
+        'lengths': 'lengths',
+        'lowerCounts': 'lower_counts',
+        'upperCounts': 'upper_counts',
+        'digitCounts': 'digit_counts',
+        'symbolCounts': 'symbol_counts',
+        'classCounts': 'class_counts',
+        'wordCounts': 'word_counts'
+    }
+
+    # The position of each feature in the order of `FEATURES`, as returned by `classify`.
+    _INDEX = {key: i for i, key in enumerate(FEATURES)}
+
+    # The pairs of features recorded together in joint histograms, when enabled.
+    JOINT_FEATURES = (('lengths', 'classCounts'), ('lengths', 'digitCounts'), ('lengths', 'wordCounts'))
+
+    # The prefix of the names of joint histograms in binary feature files.
+    JOINT_PREFIX = 'joint:'
+
+    # The first bytes of a binary feature file (i.e. a zip archive).
+    BINARY_MAGIC = b'PK\x03\x04'
+
+    __slots__ = tuple(FEATURES.values()) + ('joint', 'checkpoint', '_source', '_cache')
+
+    def __init__ (self, source=None, joint=False):
         """ Constructs a new instance of a representation of the characteristics of a set of passwords.
+
+        Args:
+            source (NpzFile): A binary feature file from which to load features lazily, or none to start empty.
+            joint (bool): Whether to also record joint histograms over the pairs of features in `JOINT_FEATURES`.
+        """
+        self._source = source
+        self._cache = {}
+        self.checkpoint = None # The dump and offset up to which it has been read, if updated incrementally.
+        if source is not None and 'checkpoint' in source.files:
+            self.checkpoint = json.loads(str(source['checkpoint']))
+        if source is None:
+            for attr in self.FEATURES.values():
+                setattr(self, attr, array('q'))
+            self.joint = {pair: JointHistogram() for pair in self.JOINT_FEATURES} if joint else {}
+
+    def __getattr__ (self, name):
+        """ Loads a feature from the binary feature file backing this object the first time it is accessed.
+
+        Args:
+            name (str): The name of the attribute being accessed.
+        Returns:
+            array: The histogram for the feature.
+        """
+        if name == 'joint' and self._source is not None:
+            self.joint = {}
+            for file_key in self._source.files:
+                if file_key.startswith(self.JOINT_PREFIX):
+                    pair = tuple(file_key[len(self.JOINT_PREFIX):].split(','))
+                    self.joint[pair] = JointHistogram.from_array(self._source[file_key])
+            return self.joint
+        keys = [key for key, attr in self.FEATURES.items() if attr == name]
+        if len(keys) == 0 or self._source is None:
+            raise AttributeError(name)
+        histogram = array('q', self._source[keys[0]].astype(np.int64).tobytes())
+        setattr(self, name, histogram)
+        return histogram
+
+    def _histograms (self):
+        """ Gets the histogram for every feature, in the order of `FEATURES`.
+
+        Returns:
+            list of array: The histograms.
         """
-        self.lengths = {}
-        self.lower_counts = {}
-        self.upper_counts = {}
-        self.digit_counts = {}
-        self.symbol_counts = {}
-        self.class_counts = {}
-        self.word_counts = {}
+        return [getattr(self, attr) for attr in self.FEATURES.values()]
+
+    @staticmethod
+    def _grow (histogram, size):
+        """ Grows a histogram with zero counts so that it holds at least a given number of values.
+
+        Args:
+            histogram (array): The histogram to grow.
+            size (int): The number of values the histogram must hold.
+        """
+        if size > len(histogram):
+            histogram.frombytes(bytes((size - len(histogram)) * histogram.itemsize))
 
     @staticmethod
     def max_key (dict):
@@ -65,42 +144,173 @@ class PasswordSetCharacteristics:
             output[int(key)] = value
         return output
 
+    @classmethod
+    def to_histogram (cls, dict):
+        """ Converts a numerically-indexed count dictionary to a histogram.
+
+        Args:
+            dict (dict): The dictionary to convert.
+        Returns:
+            array: The histogram.
+        """
+        return array('q', [dict.get(i, 0) for i in range(0, cls.max_key(dict) + 1)])
+
     @classmethod
     def load (cls, file):
         """ Loads a password set characteristics object from a file.
 
+        Both JSON and binary feature files are supported, and the format is detected automatically. Features are read
+        from binary files lazily, only when first accessed.
+
         Args:
             file (str): The filepath from which to load the object.
         Returns:
             PasswordSetCharacteristics: The loaded object.
         """
+        with open(file, 'rb') as f:
+            is_binary = f.read(len(cls.BINARY_MAGIC)) == cls.BINARY_MAGIC
+        if is_binary:
+            return cls(np.load(file))
         with open(file) as f:
             raw = json.load(f)
             obj = PasswordSetCharacteristics()
-            obj.lengths = cls.to_num_dict(raw['lengths'])
-            obj.lower_counts = cls.to_num_dict(raw['lowerCounts'])
-            obj.upper_counts = cls.to_num_dict(raw['upperCounts'])
-            obj.digit_counts = cls.to_num_dict(raw['digitCounts'])
-            obj.symbol_counts = cls.to_num_dict(raw['symbolCounts'])
-            obj.class_counts = cls.to_num_dict(raw['classCounts'])
-            obj.word_counts = cls.to_num_dict(raw['wordCounts'])
+            for key, attr in cls.FEATURES.items():
+                setattr(obj, attr, cls.to_histogram(cls.to_num_dict(raw[key])))
+            for pair, rows in raw.get('joint', {}).items():
+                obj.joint[tuple(pair.split(','))] = JointHistogram.from_array(rows)
+            obj.checkpoint = raw.get('checkpoint')
             return obj
 
+    @classmethod
+    def from_frame (cls, frame):
+        """ Creates a password set characteristics object from a password frequency distribution dataframe.
+
+        Args:
+            frame (DataFrame): The dataframe, with `password` and `frequency` columns.
+        Returns:
+            PasswordSetCharacteristics: The created object.
+        """
+        return cls.from_frames([frame])
+
+    @classmethod
+    def from_frames (cls, frames, joint=False, dedupe=False):
+        """ Creates a password set characteristics object from a stream of password frequency distribution dataframes.
+
+        Each dataframe is folded into the object and can be discarded before the next one is read.
+
+        Args:
+            frames (iterable of DataFrame): The dataframes, each with `password` and `frequency` columns.
+            joint (bool): Whether to also record joint histograms.
+            dedupe (bool): Whether to classify each distinct password in a dataframe only once.
+        Returns:
+            PasswordSetCharacteristics: The created object.
+        """
+        obj = cls(joint=joint)
+        for frame in frames:
+            obj.add_frame(frame, dedupe)
+        return obj
+
+    @classmethod
+    def from_chunks (cls, chunks, joint=False, dedupe=False):
+        """ Creates a password set characteristics object from a stream of chunks of passwords and their frequencies.
+
+        Each chunk is folded into the object and can be discarded before the next one is read.
+
+        Args:
+            chunks (iterable of tuple): The chunks, each a list of passwords (as strings or UTF-8 encoded bytes) and a
+                list of their frequencies.
+            joint (bool): Whether to also record joint histograms.
+            dedupe (bool): Whether to classify each distinct password in a chunk only once.
+        Returns:
+            PasswordSetCharacteristics: The created object.
+        """
+        obj = cls(joint=joint)
+        for pwds, freqs in chunks:
+            obj.add_chunk(pwds, freqs, dedupe)
+        return obj
+
     def to_dict (self):
         """ Transforms this object into a dictionary for JSON serialization.
 
         Returns:
             dict: The transformed object.
         """
-        return {
-            'lengths': self.lengths,
-            'lowerCounts': self.lower_counts,
-            'upperCounts': self.upper_counts,
-            'digitCounts': self.digit_counts,
-            'symbolCounts': self.symbol_counts,
-            'classCounts': self.class_counts,
-            'wordCounts': self.word_counts
-        }
+        out = {key: self.get(key) for key in self.FEATURES}
+        if len(self.joint) > 0:
+            out['joint'] = {','.join(pair): histogram.to_array().tolist() for pair, histogram in self.joint.items()}
+        if self.checkpoint is not None:
+            out['checkpoint'] = self.checkpoint
+        return out
+
+    def save (self, file):
+        """ Saves this password set characteristics object to a file.
+
+        Files with an `.npz` extension are saved in binary format, with each feature stored as an array of counts
+        indexed by value. Any other file is saved in JSON format.
+
+        Args:
+            file (str): The filepath at which to save the object.
+        """
+        if file.endswith('.npz'):
+            arrays = {key: self.get_array(key) for key in self.FEATURES}
+            for pair, histogram in self.joint.items():
+                arrays[self.JOINT_PREFIX + ','.join(pair)] = histogram.to_array()
+            if self.checkpoint is not None:
+                arrays['checkpoint'] = np.array(json.dumps(self.checkpoint))
+            np.savez(file, **arrays)
+        else:
+            with open(file, 'w') as f:
+                json.dump(self.to_dict(), f)
+
+    def merge (self, other):
+        """ Adds all passwords recorded in another password characteristics object into this one.
+
+        Args:
+            other (PasswordSetCharacteristics): The object to merge into this one.
+        """
+        self._cache.clear()
+        for histogram, counts in zip(self._histograms(), other._histograms()):
+            self._grow(histogram, len(counts))
+            for value, freq in enumerate(counts):
+                histogram[value] += freq
+        for pair, histogram in other.joint.items():
+            self.joint.setdefault(pair, JointHistogram()).merge(histogram)
+
+    def __add__ (self, other):
+        """ Combines this password characteristics object with another into a new one.
+
+        Args:
+            other (PasswordSetCharacteristics): The object to combine with this one.
+        Returns:
+            PasswordSetCharacteristics: The combined object.
+        """
+        obj = PasswordSetCharacteristics()
+        obj.merge(self)
+        obj.merge(other)
+        return obj
+
+    def get_array (self, key, accum=False, inverse=False):
+        """ Gets a histogram by its key as a read-only array of counts indexed by value.
+
+        Results are cached until more passwords are added, so repeated calls are cheap.
+
+        Args:
+            key (str): The key of the histogram to get.
+            accum (bool): Whether or not to convert the histogram to cumulative frequency before returning.
+            inverse (bool): Whether to use inverse cumulative frequency.
+        Returns:
+            ndarray: The histogram.
+        """
+        cache_key = (key, accum, accum and inverse)
+        if not cache_key in self._cache:
+            counts = np.array(getattr(self, self.FEATURES[key]), dtype=np.int64)
+            if accum and inverse:
+                counts = np.cumsum(counts[::-1])[::-1] # Accumulate from the highest value down.
+            elif accum:
+                counts = np.cumsum(counts)
+            counts.setflags(write=False)
+            self._cache[cache_key] = counts
+        return self._cache[cache_key]
 
     def get (self, key, accum=False, inverse=False):
         """ Gets a frequency dictionary by its key.
@@ -112,12 +322,12 @@ class PasswordSetCharacteristics:
         Returns:
             dict: The frequency dictionary.
         """
-        lookup = self.to_dict()
+        counts = self.get_array(key, accum, inverse).tolist()
         if accum:
-            out = self.accumulate(lookup[key], inverse)
-            return out
+            keys = range(len(counts) - 1, -1, -1) if inverse else range(0, len(counts))
+            return {i: counts[i] for i in keys}
         else:
-            return lookup[key]
+            return {i: freq for i, freq in enumerate(counts) if freq != 0}
 
     def add (self, pwd, freq):
         """ Adds a password into this password characteristics object, recording its properties.
@@ -126,44 +336,71 @@ class PasswordSetCharacteristics:
             pwd (str): The password to add.
             freq (int): The frequency of the password to add.
         """
-        # Record password lengths.
-        pwd_len = len(pwd)
-        if not pwd_len in self.lengths:
-            self.lengths[pwd_len] = 0
-        self.lengths[pwd_len] += freq
-
-        # Record password lowercase letter counts.
-        pwd_lowers = count_lowers(pwd)
-        if not pwd_lowers in self.lower_counts:
-            self.lower_counts[pwd_lowers] = 0
-        self.lower_counts[pwd_lowers] += freq
-
-        # Record password uppercase letter counts.
-        pwd_uppers = count_uppers(pwd)
-        if not pwd_uppers in self.upper_counts:
-            self.upper_counts[pwd_uppers] = 0
-        self.upper_counts[pwd_uppers] += freq
-
-        # Record password digit counts.
-        pwd_digits = count_digits(pwd)
-        if not pwd_digits in self.digit_counts:
-            self.digit_counts[pwd_digits] = 0
-        self.digit_counts[pwd_digits] += freq
-
-        # Record password symbol counts.
-        pwd_symbols = count_symbols(pwd)
-        if not pwd_symbols in self.symbol_counts:
-            self.symbol_counts[pwd_symbols] = 0
-        self.symbol_counts[pwd_symbols] += freq
-
-        # Record password chaacter class counts.
-        pwd_classes = count_classes(pwd)
-        if not pwd_classes in self.class_counts:
-            self.class_counts[pwd_classes] = 0
-        self.class_counts[pwd_classes] += freq
-
-        # Record password word counts.
-        pwd_words = count_words(pwd)
-        if not pwd_words in self.word_counts:
-            self.word_counts[pwd_words] = 0
-        self.word_counts[pwd_words] += freq
+        self._cache.clear()
+
+        # Record password lengths, letter, digit, symbol, character class and word counts in one pass.
+        histograms = (self.lengths, self.lower_counts, self.upper_counts, self.digit_counts, self.symbol_counts,
+            self.class_counts, self.word_counts)
+        features = classify_cached(pwd)
+        for histogram, value in zip(histograms, features):
+            if value >= len(histogram):
+                self._grow(histogram, value + 1)
+            histogram[value] += freq
+
+        # Record pairs of features together if asked to.
+        for (x_key, y_key), histogram in self.joint.items():
+            histogram.add(features[self._INDEX[x_key]], features[self._INDEX[y_key]], freq)
+
+    def add_many (self, pwds, freqs):
+        """ Adds many passwords into this password characteristics object at once, recording their properties.
+
+        Args:
+            pwds (list of str or list of bytes): The passwords to add, optionally UTF-8 encoded.
+            freqs (ndarray): The frequency of each password to add.
+        """
+        self.add_classified(classify_many(pwds), freqs)
+
+    def add_classified (self, features, freqs):
+        """ Adds many already classified passwords into this password characteristics object at once.
+
+        Args:
+            features (tuple of ndarray): The features of the passwords, as returned by `classify_many`.
+            freqs (ndarray): The frequency of each password to add, which may be fractional (e.g. once weighted).
+        """
+        self._cache.clear()
+        weights = np.asarray(freqs, dtype=np.float64)
+        for (x_key, y_key), histogram in self.joint.items():
+            histogram.add_many(features[self._INDEX[x_key]], features[self._INDEX[y_key]], weights)
+        for histogram, values in zip(self._histograms(), features):
+            totals = np.rint(np.bincount(values, weights=weights)).astype(np.int64) # Frequency-weighted histogram.
+            if len(totals) > 0:
+                self._grow(histogram, len(totals))
+                np.frombuffer(histogram, dtype=np.int64)[:len(totals)] += totals
+
+    def add_frame (self, frame, dedupe=False):
+        """ Adds the passwords in a password frequency distribution dataframe into this password characteristics object.
+
+        Args:
+            frame (DataFrame): The dataframe, with `password` and `frequency` columns.
+            dedupe (bool): Whether to classify each distinct password only once, summing frequencies.
+        """
+        self.add_chunk(frame['password'].astype(str).tolist(), frame['frequency'].to_numpy(dtype=np.int64), dedupe)
+
+    def add_chunk (self, pwds, freqs, dedupe=False):
+        """ Adds a chunk of passwords and their frequencies into this password characteristics object.
+
+        Deduplication pays off for chunks where the same passwords recur often (e.g. after introducing errors or
+        combining dumps), but costs time where passwords are already unique.
+
+        Args:
+            pwds (list of str or list of bytes): The passwords to add, optionally UTF-8 encoded.
+            freqs (list of int): The frequency of each password to add.
+            dedupe (bool): Whether to classify each distinct password only once, summing frequencies.
+        """
+        if dedupe:
+            uniques = {}
+            codes = [uniques.setdefault(pwd, len(uniques)) for pwd in pwds]
+            if len(uniques) < len(codes):
+                self.add_many(list(uniques), np.bincount(codes, weights=freqs, minlength=len(uniques)))
+                return
+        self.add_many(pwds, freqs)
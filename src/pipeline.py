@@ -0,0 +1,126 @@
+import sys
+import os
+import json
+
+import numpy as np
+
+from model.PasswordSetCharacteristics import PasswordSetCharacteristics
+
+from args import is_arg_passed, get_valued_arg, get_int_valued_arg, get_positional_args
+from charclass import classify_many
+from dumpreader import read_chunks
+from policy import Policy, POLICIES
+
+
+def print_usage(show_help_line=False):
+    """ Prints the short help card for the program.
+    Args:
+        show_help_line (bool): If true, information on help flag `-h` will be printed.
+    """
+    print("Usage: python pipeline.py [-h] [-o <outfile>] [--chunksize <rows>] [--joint] [--weights <w1,w2,...>]")
+    print("                          [--filters <p1;p2;...>] <infile1> [<infile2> ...]")
+    print("Extracts features from the combination of one or more password dumps, without writing the combined dump.")
+    if show_help_line:
+        print("For extended help use '-h' option.")
+
+
+def print_help():
+    """ Prints the full help card for the program.
+    """
+    print_usage()
+    print('Arguments:')
+    print('\tinfile1...: The password data dumps to combine')
+    print("Options:")
+    print("\t-h: Show this help screen")
+    print("\t-o <str>: The file in which to place output (binary format if it ends in '.npz')")
+    print("\t--chunksize <int>: Stream input files in chunks of this many rows to bound memory use")
+    print("\t--joint: Also record joint histograms of length against class, digit and word counts")
+    print("\t--weights <str>: Comma-separated factors to multiply the frequencies in each file by (default: all 1)")
+    print("\t--filters <str>: Semicolon-separated policies only compliant passwords in each file are kept under, each")
+    print("\t                 as accepted by policyfilter.py (e.g. '2class8;length=12,words=2', default: all none)")
+    print()
+    print("Available policies:", ', '.join(POLICIES))
+    print("Input files should be in CSV frequency distribution format:")
+    print("\tpassword, frequency, ... <- Column headers")
+    print("\t\"123456\", 1, ...")
+    print("\t\"password\", 18, ...")
+    print("\t\"matrix\", 14, ...")
+    print("Output will be in JSON format to standard output unless an output file is given, and is the same as running")
+    print("extractfeatures.py on the output of filtering each file and combining them with combine.py.")
+
+
+def extract_combined (files, weights=None, filters=None, chunksize=None, joint=False):
+    """ Extracts features from the combination of password dumps, streaming each once.
+
+    Features are additive over frequency, so summing those of each password in each dump gives the features of their
+    combination without it ever being built. Weighted frequencies are rounded once per chunk.
+
+    Args:
+        files (list of str): The paths of the CSV files to combine.
+        weights (list of float): The factor to multiply the frequencies in each file by, or none to leave them as-is.
+        filters (list of Policy): The policy passwords in each file must comply with, or none to keep all.
+        chunksize (int): The number of rows to read per chunk, or none to read each file at once.
+        joint (bool): Whether to also record joint histograms.
+    Returns:
+        PasswordSetCharacteristics: The features of the combined passwords.
+    """
+    characteristics = PasswordSetCharacteristics(joint=joint)
+    for i, file in enumerate(files):
+        weight = 1 if weights is None else weights[i]
+        policy = POLICIES['none'] if filters is None else filters[i]
+        for pwds, freqs in read_chunks(file, chunksize, binary=True):
+            features = classify_many(pwds)
+            freqs = np.asarray(freqs, dtype=np.float64) * weight
+            mask = policy.complies(features)
+            if not mask.all():
+                features = tuple(values[mask] for values in features)
+                freqs = freqs[mask]
+            characteristics.add_classified(features, freqs)
+    return characteristics
+
+
+# Only run when invoked directly.
+if __name__ == '__main__':
+    # If no options specified, print usage and exit.
+    if len(sys.argv) == 1:
+        print_usage(True)
+        exit(0)
+
+    # If help flag specified, print help and exit.
+    if is_arg_passed('h'):
+        print_help()
+        exit(0)
+
+    # Get output path and chunk size if specified.
+    out = get_valued_arg('o')
+    chunksize = get_int_valued_arg('chunksize')
+
+    # Remaining parameters are the raw filenames.
+    raw_files = get_positional_args(['o', 'chunksize', 'weights', 'filters'])
+    if len(raw_files) < 1 or not all(os.path.isfile(raw_file) for raw_file in raw_files):
+        print('Input file not found.', file=sys.stderr)
+        sys.exit(1)
+
+    # Get per-file weights and filters, which must be given for every file if at all.
+    weights = get_valued_arg('weights')
+    if weights is not None:
+        weights = [float(weight) for weight in weights.split(',')]
+    filters = get_valued_arg('filters')
+    if filters is not None:
+        try:
+            filters = [Policy.parse(spec) for spec in filters.split(';')] # Specs may hold commas.
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            sys.exit(1)
+    if any(values is not None and len(values) != len(raw_files) for values in (weights, filters)):
+        print('Weights and filters must be given for every input file.', file=sys.stderr)
+        sys.exit(1)
+
+    # Stream every file into one characteristics object.
+    characteristics = extract_combined(raw_files, weights, filters, chunksize, is_arg_passed('joint'))
+
+    # Save results to output file, or print them as JSON.
+    if out is not None:
+        characteristics.save(out)
+    else:
+        print(json.dumps(characteristics.to_dict()))
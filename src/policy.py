@@ -0,0 +1,71 @@
+import os
+import json
+
+
+class Policy:
+    """ Represents a password composition policy, as minimums over the features of passwords.
+
+    Policies are checked against the features returned by `classify`, or against arrays of them as returned by
+    `classify_many`, in which case a mask of compliant passwords is returned.
+    """
+
+    # The features a policy can set minimums for, in the order `classify` returns them.
+    FEATURES = ('length', 'lowers', 'uppers', 'digits', 'symbols', 'classes', 'words')
+
+    def __init__ (self, **minimums):
+        """ Constructs a new password composition policy.
+
+        Args:
+            **minimums (int): The minimum of each feature, named as in `FEATURES`. Features not given are unconstrained.
+        """
+        unknown = [name for name in minimums if not name in self.FEATURES]
+        if len(unknown) > 0:
+            raise ValueError(f'Unknown policy features: {", ".join(unknown)}')
+        self.minimums = {name: int(value) for name, value in minimums.items() if int(value) > 0}
+
+    @classmethod
+    def parse (cls, spec):
+        """ Parses a policy from a specification.
+
+        A specification is the name of a policy in `POLICIES`, the path of a JSON file holding an object of minimums, or
+        comma-separated minimums such as `length=8,classes=2`.
+
+        Args:
+            spec (str): The specification.
+        Returns:
+            Policy: The parsed policy.
+        """
+        if spec in POLICIES:
+            return POLICIES[spec]
+        if os.path.isfile(spec):
+            with open(spec) as f:
+                return cls(**json.load(f))
+        if not '=' in spec:
+            raise ValueError(f'Unknown policy: {spec}')
+        return cls(**dict(item.split('=', 1) for item in spec.split(',')))
+
+    def complies (self, features):
+        """ Checks whether passwords comply with this policy.
+
+        Args:
+            features (tuple): The features of a password as returned by `classify`, or of many passwords as returned by
+                `classify_many`.
+        Returns:
+            bool or ndarray: Whether the password complies, or a mask of which passwords comply.
+        """
+        out = features[0] >= 0 # Always true, but an array of the right shape for many passwords.
+        for name, minimum in self.minimums.items():
+            out = out & (features[self.FEATURES.index(name)] >= minimum)
+        return out
+
+    def __str__ (self):
+        return ','.join(f'{name}={minimum}' for name, minimum in self.minimums.items())
+
+
+# The named policies passwords can be filtered by.
+POLICIES = {
+    'none': Policy(),
+    'basic8': Policy(length=8),
+    '2class8': Policy(length=8, classes=2),
+    '2word12': Policy(length=12, words=2)
+}
@@ -0,0 +1,126 @@
+import sys
+import os
+
+import numpy as np
+
+from model.PasswordSetCharacteristics import PasswordSetCharacteristics
+
+from args import is_arg_passed, get_valued_arg, get_int_valued_arg
+from charclass import classify_many
+from dumpreader import read_chunks, write_pairs
+from policy import Policy, POLICIES
+
+
+def print_usage(show_help_line=False):
+    """ Prints the short help card for the program.
+    Args:
+        show_help_line (bool): If true, information on help flag `-h` will be printed.
+    """
+    print("Usage: python policyfilter.py [-h] -p <policy> [-o <outfile>] [--chunksize <rows>] [--compliant <features>]")
+    print("                              [--noncompliant <features>] [--joint] <dumpfile>")
+    print("Filters a password dump formatted as a CSV file down to passwords compliant with a composition policy.")
+    if show_help_line:
+        print("For extended help use '-h' option.")
+
+
+def print_help():
+    """ Prints the full help card for the program.
+    """
+    print_usage()
+    print('Arguments:')
+    print('\tdumpfile: The file to filter')
+    print("Options:")
+    print("\t-h: Show this help screen")
+    print("\t-p <str>: The policy to filter by, as a name, a JSON file of minimums or comma-separated minimums")
+    print("\t          (e.g. length=8,classes=2)")
+    print("\t-o <str>: The file in which to place compliant passwords")
+    print("\t--chunksize <int>: Stream the file in chunks of this many rows to bound memory use")
+    print("\t--compliant <str>: Save features of compliant passwords to this file (binary format if it ends in '.npz')")
+    print("\t--noncompliant <str>: Save features of non-compliant passwords to this file")
+    print("\t--joint: Also record joint histograms of length against class, digit and word counts")
+    print()
+    print("Available policies:", ', '.join(POLICIES))
+    print("Minimums can be given for:", ', '.join(Policy.FEATURES))
+    print("Output will be in CSV format to standard output, unless an output file is given or only features are saved.")
+
+
+def filter_dump (file, policy, out=None, chunksize=None, features=False, joint=False):
+    """ Filters a password dump down to passwords compliant with a policy, classifying each password once.
+
+    Args:
+        file (str): The path of the CSV file.
+        policy (Policy): The policy to filter by.
+        out (file): The binary file in which to place compliant passwords, or none to not output them.
+        chunksize (int): The number of rows to read per chunk, or none to read the whole file at once.
+        features (bool): Whether to extract features of compliant and non-compliant passwords.
+        joint (bool): Whether to also record joint histograms.
+    Returns:
+        tuple: The features of compliant and non-compliant passwords, or none if not extracted.
+    """
+    compliant = PasswordSetCharacteristics(joint=joint) if features else None
+    noncompliant = PasswordSetCharacteristics(joint=joint) if features else None
+    header = True
+    for pwds, freqs in read_chunks(file, chunksize):
+        classified = classify_many(pwds)
+        mask = policy.complies(classified)
+        if out is not None:
+            write_pairs(out, ((pwd, freq) for pwd, freq, keep in zip(pwds, freqs, mask.tolist()) if keep), header)
+            header = False
+        if features:
+            weights = np.asarray(freqs, dtype=np.float64)
+            compliant.add_classified(tuple(values[mask] for values in classified), weights[mask])
+            noncompliant.add_classified(tuple(values[~mask] for values in classified), weights[~mask])
+    if out is not None and header:
+        write_pairs(out, [], header) # Output a header even for an empty dump.
+    return (compliant, noncompliant) if features else None
+
+
+# Only run when invoked directly.
+if __name__ == '__main__':
+    # If no options specified, print usage and exit.
+    if len(sys.argv) == 1:
+        print_usage(True)
+        exit(0)
+
+    # If help flag specified, print help and exit.
+    if is_arg_passed('h'):
+        print_help()
+        exit(0)
+
+    # Last parameter is the raw filename.
+    raw_file = sys.argv[-1]
+    if not os.path.isfile(raw_file):
+        print('Raw data file not found.', file=sys.stderr)
+        sys.exit(1)
+
+    # Parse policy to filter by.
+    spec = get_valued_arg('p')
+    if spec is None:
+        print('A policy to filter by must be given.', file=sys.stderr)
+        sys.exit(1)
+    try:
+        policy = Policy.parse(spec)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+
+    # Get output paths and chunk size if specified.
+    out = get_valued_arg('o')
+    compliant_out = get_valued_arg('compliant')
+    noncompliant_out = get_valued_arg('noncompliant')
+    features = compliant_out is not None or noncompliant_out is not None
+    chunksize = get_int_valued_arg('chunksize')
+
+    # Filter dump, writing compliant passwords out unless only features were asked for.
+    if out is not None:
+        with open(out, 'wb') as f:
+            result = filter_dump(raw_file, policy, f, chunksize, features, is_arg_passed('joint'))
+    else:
+        result = filter_dump(raw_file, policy, None if features else sys.stdout.buffer, chunksize, features,
+            is_arg_passed('joint'))
+
+    # Save features of each partition if asked to.
+    if features:
+        for path, characteristics in zip((compliant_out, noncompliant_out), result):
+            if path is not None:
+                characteristics.save(path)
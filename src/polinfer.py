@@ -1,52 +1,17 @@
 import sys
+import os
 import json
-import math
-from functools import reduce
-
-import matplotlib.pyplot as plt
-
-from model.PasswordSetCharacteristics import PasswordSetCharacteristics
 
 from args import get_valued_arg, is_arg_passed, get_int_valued_arg
 
 
-def max_key(dict):
-    """ Returns the maximum key in an integer-keyed dictionary.
-
-    Args:
-        dict (dict): The integer-keyed dictionary.
-    Returns:
-        int: The maximum key.
-    """
-    output = 0
-    for key, value in dict.items():
-        output = max(output, int(key))
-    return output
-
-
-def to_points(dict):
-    """ Turns a dictionary of lengths into coordinate pairs.
-
-    Args:
-        dict (dict): The length frequency dictionary.
-    Returns:
-        list of tuple: The coordinate pairs.
-    """
-    points = []
-    for i in range(0, max_key(dict) + 1):
-        if i in dict:
-            points.append((i, dict[i]))
-        else:
-            points.append((i, 0))
-    return points
-
-
 def print_usage(show_help_line=False):
     """ Prints the short help card for the program.
     Args:
         show_help_line (bool): If true, information on help flag `-h` will be printed.
     """
-    print("Usage: python polinfer.py [-hcdkblutxyos] <features_file>")
+    print("Usage: python polinfer.py [-hcdkblutxyos] [--all] [--joint <key1,key2>] [--bootstrap <replicates>]")
+    print("                          [--seed <int>] <features_file>")
     print("Features file produced by extractfeatures.py expected.")
     if show_help_line:
         print("For extended help use '-h' option.")
@@ -69,6 +34,12 @@ def print_help():
     print("\t-y <label>: The chart y-axis label")
     print("\t-o <path>: The file in which to place output figure")
     print("\t-s: Suppress chart output")
+    print("\t--all: Infer lower and upper constraints on every feature, printing the policy as JSON")
+    print("\t--joint <key1,key2>: Infer a conjunctive lower constraint on a pair of features")
+    print("\t                     (features must have been extracted with '--joint')")
+    print("\t--bootstrap <int>: Also infer constraints from this many resampled histograms, reporting the distribution")
+    print("\t                   of constraints inferred and the fraction agreeing with the features file (stability)")
+    print("\t--seed <int>: The seed for resampling histograms (default: random)")
 
 
 # If no options specified, print usage and exit.
@@ -86,9 +57,6 @@ key = get_valued_arg('k')
 if key is None:
     key = 'lengths'
 
-# Load data file.
-data = PasswordSetCharacteristics.load(sys.argv[-1])
-
 # Cumulative frequency flags.
 cum_freq_mode = not is_arg_passed('c')
 inv_cum_freq_mode = is_arg_passed('d')
@@ -101,54 +69,88 @@ if outlier_threshold is None:
 # Read in lower and upper histogram limits, if passed.
 low_lim = get_int_valued_arg('l')
 if low_lim is None:
-    low_lim = 1 # Default lower length limit.
+    low_lim = 1 # Default lower limit.
 high_lim = get_int_valued_arg('u')
 if high_lim is None:
     high_lim = 20 # Default upper length limit.
 
-# Get title/labels.
-title = get_valued_arg('t')
-if not title is None:
-    plt.title(title)
-x_label = get_valued_arg('x')
-if not x_label is None:
-    plt.xlabel(x_label)
-y_label = get_valued_arg('y')
-if not y_label is None:
-    plt.ylabel(y_label)
+# Read in number of bootstrap replicates and seed, if passed.
+replicates = get_int_valued_arg('bootstrap')
+seed = get_int_valued_arg('seed')
 
-# Convert to points.
-points = to_points(data.get(key, cum_freq_mode, inv_cum_freq_mode))
-points = list(filter(lambda p: p[0] >= low_lim and p[0] <= high_lim, points)) # Enforce limits.
-print('Pulled points:', points)
+# Check data file exists before importing NumPy and inference code, which take most of the time to start up.
+if not os.path.isfile(sys.argv[-1]):
+    print('Features file not found.', file=sys.stderr)
+    exit(1)
+from model.PasswordSetCharacteristics import PasswordSetCharacteristics
+from inference import compute_deltas, find_constraint, get_points, infer_policy, infer_joint_constraint, \
+    bootstrap_constraint
 
-# Specify offset of critical number.
-offset = 1
-term = 'Lower'
+# Load data file.
+data = PasswordSetCharacteristics.load(sys.argv[-1])
 
-# Offset needs to change if we're finding upper bounds.
-if inv_cum_freq_mode:
-    offset = 0
-    term = 'Upper'
+# Infer constraints on every feature in both directions if asked to, then exit.
+if is_arg_passed('all'):
+    policy = infer_policy(data, cum_freq_mode, low_lim, high_lim, outlier_threshold, replicates, seed)
+    print(json.dumps(policy))
+    exit(0)
 
-# Convert to deltas.
-deltas = []
-for i in range(0, len(points) - 1):
-    j = points[i]
-    k = points[i + 1]
-    if inv_cum_freq_mode:
-        mult = math.inf if k[1] == 0 else j[1] / k[1]
+# Infer a conjunctive constraint on a pair of features if asked to, then exit.
+pair = get_valued_arg('joint')
+if pair is not None:
+    pair = tuple(pair.split(','))
+    if not pair in data.joint:
+        print('No joint histogram for', ' and '.join(pair), 'in features file.')
+        exit(1)
+    constraint = infer_joint_constraint(data, pair, low_lim, high_lim, outlier_threshold)
+    if constraint is None:
+        print('Conjunctive constraint on', ' and '.join(pair), 'unlikely to be present in policy.')
     else:
-        mult = math.inf if j[1] == 0 else k[1] / j[1]
-    deltas.append((j[0], mult))
+        print('Conjunctive constraint on', ' and '.join(pair), 'inferred as', ' and '.join(map(str, constraint)))
+    exit(0)
+
+# Convert to points.
+points = get_points(data, key, cum_freq_mode, inv_cum_freq_mode, low_lim, high_lim)
+print('Pulled points:', points)
+
+# Convert to deltas.
+deltas = compute_deltas(points, inv_cum_freq_mode)
 print('Computed deltas:', deltas)
 
 # Print result.
-largest = reduce(lambda i, j: i if i[1] > j[1] else j, deltas)
-if largest[1] < outlier_threshold:
+term = 'Upper' if inv_cum_freq_mode else 'Lower'
+constraint = find_constraint(deltas, outlier_threshold, inv_cum_freq_mode)
+if constraint is None:
     print(f'{term} constraint on', key, 'unlikely to be present in policy.')
 else:
-    print(f'{term} constraint on', key, 'inferred as', largest[0] + offset)
+    print(f'{term} constraint on', key, 'inferred as', constraint)
+
+# Report stability of constraint under resampling if asked to.
+if replicates is not None:
+    bootstrap = bootstrap_constraint(data, key, replicates, cum_freq_mode, inv_cum_freq_mode, low_lim, high_lim,
+        outlier_threshold, seed)
+    print('Bootstrapped constraints:', bootstrap['distribution'])
+    print(f'Stability over {replicates} replicates: {bootstrap["stability"]:.1%}', end='')
+    if bootstrap['interval'] is not None:
+        print(', 95% interval:', ' to '.join(map(str, bootstrap['interval'])), end='')
+    print()
+
+# Only draw a chart if one is to be saved or shown, as importing Matplotlib is slow.
+out = get_valued_arg('o')
+if out is None and is_arg_passed('s'):
+    exit(0)
+import matplotlib.pyplot as plt
+
+# Get title/labels.
+title = get_valued_arg('t')
+if not title is None:
+    plt.title(title)
+x_label = get_valued_arg('x')
+if not x_label is None:
+    plt.xlabel(x_label)
+y_label = get_valued_arg('y')
+if not y_label is None:
+    plt.ylabel(y_label)
 
 # Unpack deltas into arrays.
 x = [j for j,k in deltas]
@@ -161,8 +163,7 @@ plt.scatter(x, y, marker='x')
 plt.ticklabel_format(style='plain')
 plt.xticks(range(low_lim, high_lim + 1, 2))
 
-# Get output path if one was specified and save file if asked to.
-out = get_valued_arg('o')
+# Save file if asked to.
 if out is not None:
     plt.savefig(out)
 
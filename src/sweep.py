@@ -0,0 +1,106 @@
+import sys
+import csv
+
+from model.PasswordSetCharacteristics import PasswordSetCharacteristics
+
+from args import is_arg_passed, get_valued_arg
+from inference import ConstraintScanner
+
+
+def print_usage(show_help_line=False):
+    """ Prints the short help card for the program.
+    Args:
+        show_help_line (bool): If true, information on help flag `-h` will be printed.
+    """
+    print("Usage: python sweep.py [-h] [-k <keys>] [-m <modes>] [-l <limits>] [-u <limits>] [-b <thresholds>]")
+    print("                       [-o <outfile>] <features_file>")
+    print("Infers constraints over a grid of features, modes, limits and outlier thresholds to help tune inference.")
+    if show_help_line:
+        print("For extended help use '-h' option.")
+
+
+def print_help():
+    """ Prints the full help card for the program.
+    """
+    print_usage()
+    print('Arguments:')
+    print('\tfeatures_file: The features file produced by extractfeatures.py to use')
+    print("Options:")
+    print("\t-h: Show this help screen")
+    print("\t-k <keys>: Comma-separated keys of the features to use (default: all)")
+    print("\t-m <modes>: Comma-separated modes to use (default: all)")
+    print("\t-l <limits>: The lower limits of the features to use (default: 0,1)")
+    print("\t-u <limits>: The upper limits of the features to use (default: 20)")
+    print("\t-b <thresholds>: The thresholds to use for outlier detection (default: 2)")
+    print("\t-o <str>: The file in which to place output")
+    print()
+    print("Available keys:", ', '.join(PasswordSetCharacteristics.FEATURES))
+    print("Available modes:", ', '.join(ConstraintScanner.MODES), "(raw modes do not use cumulative frequencies)")
+    print("Limits and thresholds are given as comma-separated values or inclusive ranges with an optional step")
+    print("(e.g. 0:5 or 1.5:4:0.5).")
+    print()
+    print("Output will be in CSV format to standard output unless an output file is given, with a row per combination")
+    print("giving the constraint inferred (empty if none is likely) and the largest delta within limits.")
+
+
+def parse_values(spec, cast=int):
+    """ Parses comma-separated values, each either a single value or an inclusive range with an optional step.
+
+    Args:
+        spec (str): The values, such as `0,2:4` or `1.5:3:0.5`.
+        cast (type): The type of the values.
+    Returns:
+        list: The parsed values, in the order given.
+    """
+    values = []
+    for item in spec.split(','):
+        bounds = [cast(bound) for bound in item.split(':')]
+        if len(bounds) == 1:
+            values.append(bounds[0])
+            continue
+        start, stop, step = bounds if len(bounds) == 3 else bounds + [cast(1)]
+        if step <= 0:
+            raise ValueError(f'Step must be positive: {item}')
+        count = int((stop - start) / step + 1e-9) + 1 # Tolerate rounding error in fractional steps.
+        values += [cast(round(start + i * step, 9)) for i in range(max(count, 0))]
+    return values
+
+
+# If no options specified, print usage and exit.
+if len(sys.argv) == 1:
+    print_usage(True)
+    exit(0)
+
+# If help flag specified, print help and exit.
+if is_arg_passed('h'):
+    print_help()
+    exit(0)
+
+# Read in grid to sweep, applying defaults.
+keys = get_valued_arg('k')
+keys = list(PasswordSetCharacteristics.FEATURES) if keys is None else keys.split(',')
+modes = get_valued_arg('m')
+modes = list(ConstraintScanner.MODES) if modes is None else modes.split(',')
+unknown = [name for name in keys if not name in PasswordSetCharacteristics.FEATURES] + \
+    [name for name in modes if not name in ConstraintScanner.MODES]
+if len(unknown) > 0:
+    print('Unknown keys or modes:', ', '.join(unknown), file=sys.stderr)
+    sys.exit(1)
+try:
+    low_lims = parse_values(get_valued_arg('l') or '0,1')
+    high_lims = parse_values(get_valued_arg('u') or '20')
+    thresholds = parse_values(get_valued_arg('b') or '2', float)
+except ValueError as e:
+    print(e, file=sys.stderr)
+    sys.exit(1)
+
+# Precompute deltas once, then answer every query in the grid from them.
+scanner = ConstraintScanner(PasswordSetCharacteristics.load(sys.argv[-1]))
+out = get_valued_arg('o')
+f = sys.stdout if out is None else open(out, 'w', newline='')
+writer = csv.writer(f)
+writer.writerow(['key', 'mode', 'low_lim', 'high_lim', 'outlier_threshold', 'constraint', 'delta'])
+for row in scanner.sweep(keys, modes, low_lims, high_lims, thresholds):
+    writer.writerow(['' if value is None else value for value in row])
+if out is not None:
+    f.close()
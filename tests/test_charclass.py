@@ -0,0 +1,75 @@
+import os
+import sys
+import random
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from charclass import is_symbol, count_lowers, count_uppers, count_digits, count_symbols, count_classes, count_words, \
+    classify_bytes, classify_many
+
+
+def expected(val):
+    """ Computes the features of a UTF-8 encoded string with the Unicode semantics of the `count_*` functions.
+
+    Args:
+        val (bytes): The UTF-8 encoded string, which may hold invalid bytes.
+    Returns:
+        tuple of int: The length, lowercase letter, uppercase letter, digit, symbol, character class and word counts.
+    """
+    text = val.decode('utf-8', 'surrogateescape')
+    return (len(text), count_lowers(text), count_uppers(text), count_digits(text), count_symbols(text),
+        count_classes(text), count_words(text))
+
+
+def random_strings(count, seed):
+    """ Generates random byte strings, mostly ASCII but some with arbitrary (often invalid UTF-8) bytes or Unicode.
+
+    Args:
+        count (int): The number of strings to generate.
+        seed (int): The seed to generate strings with.
+    Returns:
+        list of bytes: The strings.
+    """
+    rng = random.Random(seed)
+    vals = []
+    for i in range(0, count):
+        kind = rng.random()
+        length = rng.randrange(0, 16)
+        if kind < 0.8:
+            vals.append(bytes(rng.randrange(0, 128) for j in range(0, length)))
+        elif kind < 0.9:
+            vals.append(bytes(rng.randrange(0, 256) for j in range(0, length)))
+        else:
+            vals.append(''.join(rng.choice('aZ9!éÉß٣ ۵Ωω_') for j in range(0, length)).encode('utf-8'))
+    return vals
+
+
+# Every single byte, a sample of mixed ASCII and non-ASCII strings and empty strings.
+SINGLE_BYTES = [bytes([b]) for b in range(0, 256)]
+MIXED = random_strings(5000, seed=0)
+EMPTY = [b'', b'', b'']
+
+
+@pytest.mark.parametrize('vals', [SINGLE_BYTES, MIXED, EMPTY, MIXED + EMPTY + SINGLE_BYTES],
+    ids=['single-bytes', 'mixed', 'empty', 'all'])
+def test_classify_bytes_matches_unicode_semantics(vals):
+    assert [classify_bytes(val) for val in vals] == [expected(val) for val in vals]
+
+
+@pytest.mark.parametrize('vals', [SINGLE_BYTES, MIXED, EMPTY, MIXED + EMPTY + SINGLE_BYTES, []],
+    ids=['single-bytes', 'mixed', 'empty', 'all', 'none'])
+@pytest.mark.parametrize('binary', [True, False], ids=['bytes', 'str'])
+def test_classify_many_matches_unicode_semantics(vals, binary):
+    given = vals if binary else [val.decode('utf-8', 'surrogateescape') for val in vals]
+    features = classify_many(given)
+    assert [tuple(int(value) for value in row) for row in zip(*features)] == [expected(val) for val in vals]
+
+
+def test_symbols_match_is_symbol():
+    symbols = classify_many(SINGLE_BYTES)[4]
+    for val, many in zip(SINGLE_BYTES, symbols):
+        symbol = int(is_symbol(val.decode('utf-8', 'surrogateescape')))
+        assert classify_bytes(val)[4] == symbol
+        assert many == symbol
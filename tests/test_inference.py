@@ -0,0 +1,45 @@
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from model.PasswordSetCharacteristics import PasswordSetCharacteristics
+
+from extraction import extract_features
+from gendump import generate_dump
+from inference import infer_constraint, infer_policy, infer_joint_constraint
+
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# A corpus filtered to comply with a 2class8 policy (length at least 8, at least 2 character classes).
+TWO_CLASS_FEATURES = os.path.join(ROOT, 'features', 'linkedin-2class8-errors.json')
+
+
+def test_all_infers_two_class_constraint():
+    output = subprocess.run([sys.executable, os.path.join(ROOT, 'src', 'polinfer.py'), '--all', TWO_CLASS_FEATURES],
+        stdout=subprocess.PIPE, check=True).stdout
+    policy = json.loads(output)
+    assert policy['lengths']['lower'] == 8
+    assert policy['classCounts']['lower'] == 2
+
+
+def test_all_matches_single_key_inference():
+    characteristics = PasswordSetCharacteristics.load(TWO_CLASS_FEATURES)
+    policy = infer_policy(characteristics)
+    for key in PasswordSetCharacteristics.FEATURES:
+        assert policy[key]['lower'] == infer_constraint(characteristics, key)
+        assert policy[key]['upper'] == infer_constraint(characteristics, key, inverse=True)
+
+
+@pytest.mark.parametrize('noise', [0, 0.001, 0.01], ids=['noise-free', 'slight-noise', 'noise'])
+def test_joint_infers_two_class_constraint(tmp_path, noise):
+    dump = tmp_path / 'dump.csv'
+    with open(dump, 'w') as f:
+        generate_dump(f, 50000, seed=1, policy='2class8', noise=noise)
+    characteristics = extract_features(str(dump), joint=True)
+    assert infer_joint_constraint(characteristics, ('lengths', 'classCounts')) == (8, 2)